@@ -0,0 +1,83 @@
+"""
+Benchmark suite of datasaurus, it times factory generation, `Model.save` and `Model.df` for every
+format and storage at several scales.
+
+Examples
+--------
+
+    $ python -m benchmarks run --scales 1e4 1e5 --output baseline.json
+    $ python -m benchmarks run --scales 1e4 1e5 --output current.json
+    $ python -m benchmarks compare baseline.json current.json --threshold 0.1
+
+`compare` exits with code 1 if any case is slower than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.suite import (CASES, DEFAULT_SCALES, SCALES, SHAPES, TARGETS, compare_results, get_metadata,
+                              run_benchmarks)
+
+
+def run(args) -> int:
+    results = []
+
+    for result in run_benchmarks(args.scales, args.shapes, args.targets, args.cases, repeat=args.repeat):
+        if 'error' in result:
+            print(f"{result['name']:<40} ERROR {result['error']}")
+        else:
+            print(f"{result['name']:<40} {result['median']:>10.4f}s (min {result['min']:.4f}s)")
+        results.append(result)
+
+    with open(args.output, 'w') as f:
+        json.dump({'metadata': get_metadata(), 'results': results}, f, indent=2)
+
+    print(f'Results saved to {args.output}')
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    for comparison in compare_results(baseline, current, args.threshold):
+        flag = 'REGRESSION' if comparison['regression'] else ''
+        regressions += comparison['regression']
+        print(f"{comparison['name']:<40} {comparison['baseline']:>10.4f}s -> {comparison['current']:>10.4f}s"
+              f" ({comparison['ratio']:.2f}x) {flag}")
+
+    print(f'{regressions} regressions over {args.threshold:.0%}')
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Runs the benchmarks and saves the results as JSON.')
+    run_parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=DEFAULT_SCALES)
+    run_parser.add_argument('--shapes', nargs='+', choices=list(SHAPES), default=list(SHAPES))
+    run_parser.add_argument('--targets', nargs='+', choices=TARGETS, default=TARGETS)
+    run_parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--output', default='benchmark_results.json')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser('compare', help='Compares results against a baseline.')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='Slowdown over which a case is a regression, 0.1 is 10%%.')
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""
+Models, synthetic data and cases of the benchmark suite, see `benchmarks/__main__.py`.
+
+Every case is timed for every target (a `FileFormat` in a `LocalStorage` or a `SqliteStorage`),
+shape (narrow or wide) and scale:
+
+- factory: `ModelFactory.create_df`, capped to `FACTORY_MAX_ROWS` rows since it builds the rows
+  in python, the larger scales repeat the generated rows with polars.
+- save: `Model.save` of data given with `Model.from_data`, every repetition saves to an empty
+  target (sqlite saves append to the table).
+- df: `Model.df` of the data saved by the 'save' case, read back from the storage.
+"""
+import contextlib
+import datetime
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import polars
+
+from datasaurus import instrumentation, set_global_env
+from datasaurus.core.models import Model
+from datasaurus.core.models.columns import StringColumn, IntegerColumn, FloatColumn, DateColumn
+from datasaurus.core.models.factory import ModelFactory, factory_attribute
+from datasaurus.core.storage import StorageGroup
+from datasaurus.core.storage.storage import LocalStorage, SqliteStorage
+from datasaurus.core.storage.format import FileFormat
+
+SCALES = {
+    '1e4': 10_000,
+    '1e5': 100_000,
+    '1e6': 1_000_000,
+    '1e7': 10_000_000,
+    '1e8': 100_000_000,
+}
+DEFAULT_SCALES = ['1e4', '1e5', '1e6']
+
+# Columns of every type, the wide shape repeats them.
+SHAPES = {
+    'narrow': 1,
+    'wide': 10,
+}
+
+TARGETS = [*(file_format.name for file_format in FileFormat), 'sqlite']
+
+CASES = ['factory', 'save', 'df']
+
+FACTORY_MAX_ROWS = 100_000
+
+RESULTS_VERSION = 1
+
+ENVIRONMENT = 'benchmark'
+
+SQLITE_FILE_NAME = 'bench.sqlite'
+
+# The generated data is the same in every run.
+RANDOM_SEED = 42
+
+
+def _random_string() -> str:
+    return ''.join(random.choices(string.ascii_letters, k=12))
+
+
+def _random_date() -> datetime.date:
+    return datetime.date(2000, 1, 1) + datetime.timedelta(days=random.randint(0, 10_000))
+
+
+_COLUMN_TYPES = [
+    (StringColumn, _random_string),
+    (IntegerColumn, lambda: random.randint(0, 1_000_000)),
+    (FloatColumn, random.random),
+    (DateColumn, _random_date),
+]
+
+
+def create_model(shape: str, storage: type, file_format: Optional[FileFormat]):
+    """Creates the model of the given shape, saved to `storage` in `file_format`."""
+    attrs = {
+        f'{column_class.__name__.lower()}_{i}': column_class()
+        for i in range(SHAPES[shape])
+        for column_class, _ in _COLUMN_TYPES
+    }
+    meta = type('Meta', (), {
+        'storage': storage,
+        'table_name': f'bench_{shape}',
+        'format': file_format,
+    })
+    return type(Model)(f'Bench{shape.capitalize()}', (Model,), {**attrs, 'Meta': meta, '__module__': __name__})
+
+
+def create_factory(model, shape: str):
+    attrs = {
+        f'{column_class.__name__.lower()}_{i}': factory_attribute(generator)
+        for i in range(SHAPES[shape])
+        for column_class, generator in _COLUMN_TYPES
+    }
+    meta = type('Meta', (), {'model': model})
+    return type(f'{model.__name__}Factory', (ModelFactory,), {**attrs, 'Meta': meta})
+
+
+def generate_data(factory, rows: int) -> polars.DataFrame:
+    """
+    Generates `rows` rows with the factory, above `FACTORY_MAX_ROWS` the generated rows are
+    repeated.
+    """
+    seed = factory.create_df(min(rows, FACTORY_MAX_ROWS)).df
+
+    if rows <= seed.height:
+        return seed
+
+    return polars.concat([seed] * -(-rows // seed.height), rechunk=True).head(rows)
+
+
+def create_target(target: str, path: str) -> Tuple[type, Optional[FileFormat]]:
+    """Returns the storage group and the format of a target, its environment is `ENVIRONMENT`."""
+    if target == 'sqlite':
+        storage, file_format = SqliteStorage(path=os.path.join(path, SQLITE_FILE_NAME)), None
+    else:
+        storage, file_format = LocalStorage(path=path), FileFormat[target]
+
+    return type('BenchmarkStorage', (StorageGroup,), {ENVIRONMENT: storage}), file_format
+
+
+def reset_target(target: str, path: str) -> None:
+    """Removes the data saved to a target, saves to a sqlite table append to it."""
+    if target == 'sqlite':
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(path, SQLITE_FILE_NAME))
+
+
+def _timed(func, repeat: int, setup: Optional[Callable[[], None]] = None) -> Tuple[List[float], dict]:
+    """
+    Runs func `repeat` times, after `setup` if given (it is not timed), returns the wall times and
+    the phases of the last run.
+    """
+    times = []
+
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+
+        with instrumentation.InstrumentationCollector() as collector:
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+    phases = {
+        phase: {'wall_time': aggregate['wall_time'], 'peak_rss_delta': aggregate['peak_rss_delta']}
+        for model_phases in collector.summary().values()
+        for phase, aggregate in model_phases.items()
+    }
+    return times, phases
+
+
+def run_benchmarks(scales: List[str], shapes: List[str], targets: List[str], cases: List[str],
+                   repeat: int = 3) -> Iterator[dict]:
+    """Yields the result of every case, a case that fails yields its error instead of times."""
+    random.seed(RANDOM_SEED)
+    set_global_env(ENVIRONMENT)
+
+    for shape in shapes:
+        for scale in scales:
+            rows = SCALES[scale]
+            data = None
+
+            for target in targets:
+                path = tempfile.mkdtemp(prefix='datasaurus_bench_')
+                try:
+                    storage, file_format = create_target(target, path)
+                    model = create_model(shape, storage, file_format)
+                    factory = create_factory(model, shape)
+
+                    if data is None:
+                        data = generate_data(factory, rows)
+
+                    case_funcs = {
+                        'factory': lambda: factory.create_df(min(rows, FACTORY_MAX_ROWS)).df,
+                        'save': lambda: model.from_data(data).save(),
+                        'df': lambda: (model.invalidate(), model.df),
+                    }
+                    case_setups = {
+                        'save': lambda: reset_target(target, path),
+                    }
+
+                    for case in cases:
+                        if case == 'factory' and target != targets[0]:
+                            # Factory generation does not depend on the target.
+                            continue
+
+                        result = {
+                            'name': f'{case}/{target}/{shape}/{scale}',
+                            'case': case,
+                            'target': target,
+                            'shape': shape,
+                            'rows': min(rows, FACTORY_MAX_ROWS) if case == 'factory' else rows,
+                        }
+                        try:
+                            times, phases = _timed(case_funcs[case], repeat, case_setups.get(case))
+                        except Exception as e:
+                            result['error'] = f'{type(e).__name__}: {e}'
+                        else:
+                            result.update({
+                                'times': times,
+                                'min': min(times),
+                                'median': statistics.median(times),
+                                'phases': phases,
+                            })
+                        yield result
+                finally:
+                    shutil.rmtree(path, ignore_errors=True)
+
+
+def get_metadata() -> dict:
+    return {
+        'version': RESULTS_VERSION,
+        'date': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'polars': polars.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> Iterator[Dict]:
+    """
+    Yields the comparison of every case in both results, a case regressed if its median time
+    grew more than `threshold` (0.1 is 10%).
+    """
+    baseline_results = {result['name']: result for result in baseline['results']}
+
+    for result in current['results']:
+        baseline_result = baseline_results.get(result['name'])
+        if baseline_result is None or 'median' not in baseline_result or 'median' not in result:
+            continue
+
+        ratio = result['median'] / baseline_result['median'] if baseline_result['median'] else 1.0
+        yield {
+            'name': result['name'],
+            'baseline': baseline_result['median'],
+            'current': result['median'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        }
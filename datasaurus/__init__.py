@@ -1,5 +1,9 @@
 import os
 
+from datasaurus.core import instrumentation
+
+__all__ = ['instrumentation', 'set_global_env']
+
 
 def set_global_env(environment_name: str) -> None:
     os.environ['DATASAURUS_ENVIRONMENT'] = environment_name
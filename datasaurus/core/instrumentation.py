@@ -0,0 +1,185 @@
+"""
+Events with the time, cpu, rows, size and memory of every phase of a model's materialization.
+
+Examples
+--------
+
+    >>> from datasaurus import instrumentation
+    >>> with instrumentation.InstrumentationCollector() as collector:
+    ...     GithubCommit.save()
+    >>> collector.summary()[GithubCommit]['read']
+    {'count': 1, 'wall_time': 1.2, 'cpu_time': 3.4, 'rows': 100000, 'bytes': 5600000, 'peak_rss_delta': 6000000}
+"""
+import contextlib
+import dataclasses
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+resource = None
+with contextlib.suppress(ImportError):
+    # Not available on Windows, peak rss is then not reported.
+    import resource
+
+RESOLVE_STORAGE = 'resolve_storage'
+EXISTS = 'exists'
+READ = 'read'
+CALCULATE = 'calculate'
+VALIDATE = 'validate'
+CAST = 'cast'
+SELECT = 'select'
+WRITE = 'write'
+
+
+@dataclasses.dataclass(frozen=True)
+class PhaseEvent:
+    """
+    Emitted when a phase of the materialization of a model ends.
+
+    `cpu_time` is the cpu time of the whole process during the phase, so it includes the
+    threads of polars' pool but also the ones of other phases that run at the same time (see
+    `ModelScheduler`). `rows` and `bytes` are the ones of the dataframe the phase produced,
+    None if the phase does not produce one or it is lazy. `peak_rss_delta` is how much the peak resident memory of the
+    process grew during the phase in bytes, None where it cannot be measured.
+    """
+    model: object
+    phase: str
+    wall_time: float
+    cpu_time: float
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    peak_rss_delta: Optional[int] = None
+
+
+_subscribers: List[Callable[[PhaseEvent], None]] = []
+_subscribers_lock = threading.Lock()
+
+
+def subscribe(callback: Callable[[PhaseEvent], None]) -> Callable[[PhaseEvent], None]:
+    """
+    Calls `callback` with every `PhaseEvent`, from the thread the phase ran in. Returns the
+    callback so it can be used as a decorator.
+    """
+    global _subscribers
+    with _subscribers_lock:
+        # Copied on write, so emitting never needs the lock.
+        _subscribers = [*_subscribers, callback]
+    return callback
+
+
+def unsubscribe(callback: Callable[[PhaseEvent], None]) -> None:
+    global _subscribers
+    with _subscribers_lock:
+        _subscribers = [subscriber for subscriber in _subscribers if subscriber != callback]
+
+
+def _get_peak_rss() -> Optional[int]:
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+class _Phase:
+    """
+    Handle of a running phase, set `frame` to the dataframe the phase produced to report its
+    rows and size.
+    """
+    __slots__ = ('frame',)
+
+    def __init__(self):
+        self.frame = None
+
+
+@contextlib.contextmanager
+def phase(model, name: str):
+    """
+    Measures the code inside the context manager as the phase `name` of `model`, does nothing
+    if there are no subscribers.
+    """
+    handle = _Phase()
+
+    if not _subscribers:
+        yield handle
+        return
+
+    peak_rss = _get_peak_rss()
+    # Process wide, polars does most of the work in its own threads.
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    yield handle
+
+    wall_time = time.perf_counter() - wall_start
+    cpu_time = time.process_time() - cpu_start
+
+    rows = size = None
+    # LazyFrames have no rows or size until collected.
+    if handle.frame is not None and hasattr(handle.frame, 'estimated_size'):
+        rows, size = handle.frame.height, handle.frame.estimated_size()
+
+    event = PhaseEvent(
+        model=model,
+        phase=name,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        rows=rows,
+        bytes=size,
+        peak_rss_delta=None if peak_rss is None else _get_peak_rss() - peak_rss,
+    )
+
+    for subscriber in _subscribers:
+        subscriber(event)
+
+
+class InstrumentationCollector:
+    """
+    Collects the events and aggregates them by model and phase, it subscribes itself when
+    used as a context manager.
+    """
+
+    def __init__(self):
+        self.events: List[PhaseEvent] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: PhaseEvent) -> None:
+        with self._lock:
+            self.events.append(event)
+
+    def __enter__(self) -> 'InstrumentationCollector':
+        subscribe(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        unsubscribe(self)
+
+    def summary(self) -> Dict[object, Dict[str, dict]]:
+        """
+        Returns model -> phase -> {count, wall_time, cpu_time, rows, bytes, peak_rss_delta},
+        times, rows and bytes are summed, peak_rss_delta is the max.
+        """
+        summary = defaultdict(dict)
+
+        with self._lock:
+            events = list(self.events)
+
+        for event in events:
+            aggregate = summary[event.model].setdefault(event.phase, {
+                'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0, 'rows': 0, 'bytes': 0, 'peak_rss_delta': 0
+            })
+            aggregate['count'] += 1
+            aggregate['wall_time'] += event.wall_time
+            aggregate['cpu_time'] += event.cpu_time
+            aggregate['rows'] += event.rows or 0
+            aggregate['bytes'] += event.bytes or 0
+            aggregate['peak_rss_delta'] = max(aggregate['peak_rss_delta'], event.peak_rss_delta or 0)
+
+        return dict(summary)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.events.clear()
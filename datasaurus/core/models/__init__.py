@@ -1,4 +1,6 @@
 from datasaurus.core.models.base import Model
-from datasaurus.core.models.exceptions import MissingMetaError
+from datasaurus.core.models.batch import ModelBatch
+from datasaurus.core.models.exceptions import MissingMetaError, ModelSaveError, ValidationError
+from datasaurus.core.models.scheduler import ModelScheduler
 
-__all__ = ['Model', 'MissingMetaError']
+__all__ = ['Model', 'MissingMetaError', 'ModelBatch', 'ModelSaveError', 'ModelScheduler', 'ValidationError']
@@ -1,17 +1,33 @@
+import datetime
+import json
 from abc import ABCMeta
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from functools import partial
-from typing import Callable, Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import polars
-from polars import DataFrame
+from polars import DataFrame, LazyFrame
 from polars.type_aliases import FrameInitTypes, SchemaDefinition
 
-from datasaurus.core import classproperty
+from datasaurus.core import classproperty, instrumentation
+from datasaurus.core.loggers import datasaurus_logger
 from datasaurus.core.models.exceptions import MissingMetaError, FormatNotSupportedByModelError, \
-    FormatNeededError, ColumnNotExistsError
-from datasaurus.core.storage.format import DataFormat
+    FormatNeededError, ColumnNotExistsError, ModelSaveError
+from datasaurus.core.storage.format import COMPRESSION_SUFFIXES, DataFormat, FileFormat
 from datasaurus.core.storage.base import Storage, StorageGroup
+from datasaurus.core.storage.query import Lookup
+from datasaurus.core.models.batch import ModelBatch
+from datasaurus.core.models.cache import ModelCache, model_cache
 from datasaurus.core.models.columns import Column, Columns
+from datasaurus.core.models.validators import ValidationPlan
+from datasaurus.core.models.scheduler import current_run
+
+# Models whose df/lf is accessed while the current calculate_data runs, see `ModelMeta._create_df`.
+_accessed_models: ContextVar[Optional[Set]] = ContextVar('_accessed_models', default=None)
+
+# Data given with `Model.from_data` by model, see `ModelMeta._bind_data`.
+_bound_data: ContextVar[Dict] = ContextVar('_bound_data', default={})
 
 
 class lazy_func:
@@ -33,9 +49,21 @@ class ModelMetaOptions:
         'table_name',
         'recalculate',
         'format',
-        'columns'
+        'columns',
+        'cache',
+        'depends_on',
+        'watermark',
+        'outputs',
+        'quarantine',
+        'shrink_dtypes',
+        'parquet_options',
+        'partition_by',
+        'ipc_compression',
     ]
 
+    # Compressions of Arrow IPC files, only uncompressed files can be memory mapped.
+    IPC_COMPRESSIONS = ('uncompressed', 'lz4', 'zstd')
+
     def __init__(self, *, meta, model):
         self.meta = meta
         self.model = model
@@ -45,12 +73,44 @@ class ModelMetaOptions:
         self.table_name = ''
         self.recalculate = 'if_not_data_in_storage'
         self.format = None
+        self.cache = False
+        self.depends_on = ()
+        self.watermark = None
+        self.outputs = ()
+        self.quarantine = None
+        self.shrink_dtypes = False
+        self.parquet_options = {}
+        self.partition_by = ()
+        self.ipc_compression = 'uncompressed'
 
         # Options from model
         self.columns = Columns()
 
+        # Models read by calculate_data, recorded every time it runs.
+        self.upstreams = set()
+
         self._populate_from_meta()
         self._set_up_columns()
+        self.columns.shrink_dtypes = self.shrink_dtypes
+
+        if self.watermark and self.watermark not in self.columns.get_model_columns():
+            raise ValueError(f"Watermark column '{self.watermark}' does not exist in {self.model}")
+
+        # Raises if any partition column does not exist.
+        self.partition_columns = [self.columns.get_column(name).get_column_name() for name in self.partition_by]
+
+        unknown_parquet_options = set(self.parquet_options).difference(Columns.PARQUET_OPTIONS)
+        if unknown_parquet_options:
+            raise ValueError(f'Invalid parquet options {unknown_parquet_options} in {self.model},'
+                             f' options are: {set(Columns.PARQUET_OPTIONS)}')
+
+        if self.ipc_compression not in self.IPC_COMPRESSIONS:
+            raise ValueError(f"Invalid ipc compression '{self.ipc_compression}' in {self.model},"
+                             f' compressions are: {self.IPC_COMPRESSIONS}')
+
+        if self.watermark and self.columns.get_auto_dtype_columns():
+            raise ValueError(f"Incremental model {self.model} cannot shrink dtypes, the rows it appends"
+                             " could need wider dtypes than the ones already saved")
 
     def _set_up_columns(self):
         """
@@ -121,8 +181,17 @@ class PreparedMeta(ABCMeta):
 
 class ModelMeta(PreparedMeta):
     df: DataFrame
+    lf: LazyFrame
     _meta: ModelMetaOptions
-    _data_from_cls: Optional[dict] = None
+
+    # Every model by '<module>.<qualname>', used to resolve the upstreams in manifests.
+    _registry: Dict[str, 'ModelMeta'] = {}
+
+    def __new__(mcs, name, bases, attrs, **kwargs):
+        # Models have no instance attributes, the values of the columns are kept in the slots of
+        # their row class, see `_create_row_class`.
+        attrs.setdefault('__slots__', ())
+        return super().__new__(mcs, name, bases, attrs, **kwargs)
 
     def _prepare(cls):
         meta = getattr(cls, 'Meta', None)
@@ -133,6 +202,52 @@ class ModelMeta(PreparedMeta):
 
         setattr(cls, '_meta', opts)
         setattr(cls, 'df', lazy_func(cls._get_df))
+        setattr(cls, 'lf', lazy_func(cls._get_lf))
+        setattr(cls, '_row_class', cls._create_row_class())
+
+        ModelMeta._registry[cls._get_model_key()] = cls
+
+    def _create_row_class(cls) -> 'ModelMeta':
+        """
+        Returns the class of the instances of the model, a subclass with a slot per column, so
+        instances have no __dict__ and only columns can be set on them.
+
+        It is created without preparing it again, its options are the ones of the model.
+        """
+        column_names = cls._meta.columns.get_model_columns()
+        return ABCMeta.__new__(ModelMeta, cls.__name__, (cls,), {
+            '__slots__': tuple(column_names),
+            '__module__': cls.__module__,
+            '__qualname__': cls.__qualname__,
+            '_column_names': frozenset(column_names),
+        })
+
+    def _get_model_key(cls) -> str:
+        return f'{cls.__module__}.{cls.__qualname__}'
+
+    def _bind_data(cls, data: FrameInitTypes, schema: SchemaDefinition = None) -> None:
+        """
+        Binds the data to the model in the current context (thread, asyncio task..), the next
+        dataframe creation of the model in this context uses it, other contexts are not affected.
+
+        The bindings are copied on write, contexts copied from this one (like the ones of
+        `ModelScheduler` tasks) see the data but do not consume it for this one.
+        """
+        _bound_data.set({**_bound_data.get(), cls: (data, schema)})
+
+    def _has_bound_data(cls) -> bool:
+        return cls in _bound_data.get()
+
+    def _pop_bound_data(cls) -> DataFrame:
+        bound_data = dict(_bound_data.get())
+        data, schema = bound_data.pop(cls)
+        _bound_data.set(bound_data)
+
+        if isinstance(data, DataFrame) and schema is None:
+            # Zero-copy, the given dataframe is used as is.
+            return data
+
+        return polars.DataFrame(data, schema=schema)
 
     def _get_storage_or_default(cls, storage: Optional[Union[Storage, type(StorageGroup)]],
                                 environment: Optional[str] = None) -> Storage:
@@ -164,7 +279,8 @@ class ModelMeta(PreparedMeta):
 
         There are two ways of getting it:
         1. From meta.format
-        2. Inferring it from the meta.table_name
+        2. Inferring it from the meta.table_name, compressed files have two extensions
+           ('events.ndjson.gz').
         """
         if format:
             return format
@@ -172,14 +288,225 @@ class ModelMeta(PreparedMeta):
         if cls._meta.format:
             return cls._meta.format
 
-        if cls._meta.table_name.__contains__('.'):
-            table_name, file_extension = cls._meta.table_name.split('.')
-            if file_extension:
-                return file_extension
+        table_name, *file_extensions = cls._meta.table_name.split('.')
+        if file_extensions and file_extensions[-1]:
+            if len(file_extensions) > 1 and file_extensions[-1].lower() in COMPRESSION_SUFFIXES:
+                return '.'.join(file_extensions[-2:])
+            return file_extensions[-1]
 
         return
 
-    def _create_df(cls, storage: Optional[Storage]) -> DataFrame:
+    def _get_storage_and_format(cls, storage: Optional[Union[Storage, StorageGroup]]):
+        """
+        Resolves the storage and the format the data of the model will be read from.
+        """
+        with instrumentation.phase(cls, instrumentation.RESOLVE_STORAGE):
+            storage = cls._get_storage_or_default(storage)
+            format = cls._get_format_or_default()
+
+            if isinstance(format, str):
+                format = storage.supported_formats[format]
+
+        if format and not storage.supports_format(format):
+            raise ValueError(
+                f"Storage of type '{type(storage)}' does not support format '{format}',"
+                f" supported formats by this storage are '{storage.supported_formats}'"
+            )
+
+        if storage.needs_format and not format:
+            raise FormatNeededError(
+                f"Cannot create Dataframe because storage of type '{type(storage)}'"
+                " needs a format and it was not provided in the Meta class or it could"
+                " not be inferred from the table_name attribute. To fix this add format "
+                " in the Model's Meta class or an extension to the table_name"
+            )
+
+        return storage, format
+
+    def _get_cache(cls) -> Optional[ModelCache]:
+        """
+        Returns the cache used by the model, `Meta.cache` can be True to use the global cache
+        or a `ModelCache` instance to use a different budget.
+        """
+        if isinstance(cls._meta.cache, ModelCache):
+            return cls._meta.cache
+
+        return model_cache if cls._meta.cache else None
+
+    def _get_cache_key(cls, storage: Optional[Union[Storage, StorageGroup]]) -> tuple:
+        """
+        The key of the model's dataframe in the cache, it changes when the source data changes.
+        """
+        storage, format = cls._get_storage_and_format(storage)
+        return (
+            cls,
+            type(storage).__qualname__,
+            storage.get_uri(),
+            storage.environment_name,
+            cls._meta.table_name,
+            str(format),
+            storage.get_version(cls._meta.table_name, format),
+        )
+
+    def _needs_calculation(cls, storage: Storage, format: Optional[DataFormat]) -> bool:
+        """
+        Whether the data has to come from calculate_data instead of the storage, depending on
+        `Meta.recalculate`:
+
+        - 'always': Always.
+        - 'if_not_data_in_storage': If the data is not in the storage.
+        - 'if_stale': If the data is not in the storage or any of the models calculate_data read
+          changed since the data was saved, see `_is_stale`.
+        - Anything else: Never.
+        """
+        recalculate = cls._meta.recalculate
+
+        if recalculate == 'always':
+            return True
+
+        if recalculate in ('if_not_data_in_storage', 'if_stale'):
+            with instrumentation.phase(cls, instrumentation.EXISTS):
+                exists = storage.file_exists(cls._meta.table_name, format)
+
+            if not exists:
+                return True
+
+        if recalculate == 'if_stale':
+            return cls._is_stale(storage, format)
+
+        return False
+
+    def _get_version(cls):
+        """
+        The version of the data of the model in its storage, json-normalized so it can be
+        compared with the versions stored in manifests.
+        """
+        storage, format = cls._get_storage_and_format(None)
+        return json.loads(json.dumps(storage.get_version(cls._meta.table_name, format)))
+
+    def _get_manifest(cls, schema: Optional[Dict[str, polars.DataType]] = None) -> dict:
+        """
+        Returns the manifest of the model for data saved with the given schema: the current
+        versions of the models it reads from if it is recalculated 'if_stale' and the dtypes
+        chosen for its columns with dtype 'auto'. Empty if there is nothing to keep.
+        """
+        manifest = {}
+
+        if cls._meta.recalculate == 'if_stale':
+            upstreams = set(cls._meta.depends_on) | cls._meta.upstreams
+            manifest['upstreams'] = {
+                upstream._get_model_key(): upstream._get_version() for upstream in upstreams
+            }
+
+        auto_dtype_columns = cls._meta.columns.get_auto_dtype_columns()
+        if schema and auto_dtype_columns:
+            manifest['dtypes'] = {
+                column.get_column_name(): str(schema[column.get_column_name()])
+                for column in auto_dtype_columns
+            }
+
+        return manifest
+
+    def _get_saved_dtypes(cls, storage: Storage, format: Optional[DataFormat]) -> Dict[str, polars.DataType]:
+        """
+        Returns the dtypes that were chosen for the columns with dtype 'auto' when the data was
+        saved, so they are not computed again when it is read.
+        """
+        if not cls._meta.columns.get_auto_dtype_columns():
+            return {}
+
+        manifest = storage.read_manifest(cls._meta.table_name, format) or {}
+        return {name: getattr(polars, dtype) for name, dtype in manifest.get('dtypes', {}).items()}
+
+    def _cast_to_saved_dtypes(cls, df: Union[DataFrame, LazyFrame], storage: Storage,
+                              format: Optional[DataFormat]) -> Union[DataFrame, LazyFrame]:
+        dtypes = cls._get_saved_dtypes(storage, format)
+        casts = [polars.col(name).cast(dtype) for name, dtype in dtypes.items() if name in df.columns]
+        return df.with_columns(casts) if casts else df
+
+    def _get_manifest_upstreams(cls) -> Set:
+        """
+        Returns the models recorded as upstreams in the manifest saved with the data, the ones
+        that no longer exist are left out.
+        """
+        storage, format = cls._get_storage_and_format(None)
+        manifest = storage.read_manifest(cls._meta.table_name, format) or {}
+
+        return {
+            ModelMeta._registry[model_key]
+            for model_key in manifest.get('upstreams', {})
+            if model_key in ModelMeta._registry
+        }
+
+    def _is_stale(cls, storage: Storage, format: Optional[DataFormat]) -> bool:
+        """
+        Compares the upstream versions in the manifest that was saved with the data against
+        the current ones. The data is stale if there is no manifest, it has no upstreams or
+        any upstream is unknown, has changed or its version cannot be known.
+        """
+        manifest = storage.read_manifest(cls._meta.table_name, format)
+
+        if not manifest or not manifest.get('upstreams'):
+            return True
+
+        for model_key, version in manifest['upstreams'].items():
+            upstream = ModelMeta._registry.get(model_key)
+
+            if upstream is None:
+                return True
+
+            current_version = upstream._get_version()
+
+            if current_version is None or current_version != version:
+                datasaurus_logger.debug(f'{cls} is stale, {upstream} changed')
+                return True
+
+            cls._meta.upstreams.add(upstream)
+
+        return False
+
+    def _calculate_data(cls, **kwargs) -> Union[DataFrame, LazyFrame]:
+        """
+        Calls calculate_data, recording the models it reads in `Meta.upstreams`.
+        """
+        accessed_models = set()
+        token = _accessed_models.set(accessed_models)
+        try:
+            with instrumentation.phase(cls, instrumentation.CALCULATE) as phase:
+                df = phase.frame = cls.calculate_data(cls, **kwargs)
+
+        except NotImplementedError as e:
+            raise ValueError(
+                'Cannot generate dataframe, either no data can be read from storage or '
+                ' calculate_data is not defined in the model.') from e
+
+        finally:
+            _accessed_models.reset(token)
+
+        cls._meta.upstreams.update(accessed_models - {cls})
+
+        if not isinstance(df, (DataFrame, LazyFrame)):
+            raise ValueError(
+                'Function calculate_data has to return a polars Dataframe or LazyFrame,'
+                f' not a {type(df)}')
+
+        return df
+
+    def _get_watermark(cls, storage: Storage, format: Optional[DataFormat], table_name: str):
+        """
+        Returns the max value of the `Meta.watermark` column already in the storage, None if
+        there is no data. Only the watermark column is read, see `Storage.read_max`.
+        """
+        if not storage.file_exists(table_name, format):
+            return None
+
+        column = cls._meta.columns.get_column(cls._meta.watermark)
+        return storage.read_max(table_name, column.get_column_name(), format=format,
+                                cast=column.get_col_with_dtype, **cls._get_read_options(format))
+
+    def _create_df(cls, storage: Optional[Storage], lazy: bool = False,
+                   lookups: Optional[List[Lookup]] = None,
+                   predicates: Optional[List[polars.Expr]] = None) -> Union[DataFrame, LazyFrame]:
         """
         Does the heavy lifting of creating the Dataframe from the right data source, depending on
         Options (Meta class in model), the order of priority is as follows:
@@ -187,57 +514,322 @@ class ModelMeta(PreparedMeta):
         1. Data from constructor - Model.from_dict({'column1': [1,2,3]})
         2. Data from calculation - Model.calculate_data()
         3. Data from Storage - Storage
+
+        The columns are then applied, see `_apply_columns`. Only the invalid rows of new data
+        (from the constructor or a calculation) are quarantined, the data in storage was already
+        quarantined when it was calculated, reading it again does not quarantine its rows again.
+
+        If `lazy` is True a LazyFrame is returned, data from storage is then scanned instead
+        of read, so the read can benefit from projection and predicate pushdown. `lookups` are
+        passed to the scan so storages that can filter while reading do, `predicates` only to
+        the scans of partitioned files, to skip the partitions that cannot match them.
+        """
+        if cls._has_bound_data():
+            df = cls._pop_bound_data()
+            return cls._apply_columns(df.lazy() if lazy else df)
+
+        storage, format = cls._get_storage_and_format(storage)
+
+        if cls._needs_calculation(storage, format):
+            # Incremental models calculate everything if their data is not read from storage.
+            df = cls._calculate_data(**({'watermark': None} if cls._meta.watermark else {}))
+
+            if lazy:
+                return cls._apply_columns(df.lazy())
+
+            return cls._apply_columns(df.collect() if isinstance(df, LazyFrame) else df)
+
+        read_kwargs = cls._get_read_options(format, eager=not lazy)
+
+        if lazy and predicates and 'partition_by' in read_kwargs:
+            read_kwargs['predicates'] = predicates
+
+        with instrumentation.phase(cls, instrumentation.READ) as phase:
+            if lazy:
+                df = cls._cast_to_saved_dtypes(
+                    storage.scan_file(cls._meta.table_name, cls._meta.columns.get_source_column_names(),
+                                      format=format, lookups=lookups, **read_kwargs),
+                    storage,
+                    format
+                )
+            else:
+                df = phase.frame = cls._cast_to_saved_dtypes(
+                    storage.read_file(cls._meta.table_name, cls._meta.columns.get_source_column_names(),
+                                      format=format, **read_kwargs),
+                    storage,
+                    format
+                )
+
+        return cls._apply_columns(df, quarantine=False)
+
+    def _apply_columns(cls, df: Union[DataFrame, LazyFrame], shrink: bool = True,
+                       quarantine: bool = True) -> Union[DataFrame, LazyFrame]:
         """
-        if cls._data_from_cls is not None:
-            df = polars.DataFrame(cls._data_from_cls, schema=cls._schema)
-            del cls._data_from_cls
-            del cls._schema
-            cls._data_from_cls = None
-            cls._schema = None
-            return df
+        Applies column validation, column datatype casting and column filtering to the given
+        Dataframe or LazyFrame, on a LazyFrame the steps are only added to the query plan.
 
-        storage = cls._get_storage_or_default(storage)
-        format = cls._get_format_or_default()
+        Computed columns are computed together with the casts, see `Columns.compile_plan`.
+
+        Columns with dtype 'auto' are cast to the narrowest dtype that fits the data, only on
+        a Dataframe and if `shrink` is True, otherwise they keep the default dtype.
+
+        If `quarantine` is False invalid rows of models with `Meta.quarantine` are only removed,
+        see `_validate`.
+        """
+        # Column validation, dtype casting and filtering, compiled once per source schema.
+        with instrumentation.phase(cls, instrumentation.VALIDATE):
+            plan = cls._meta.columns.get_plan(df.schema)
+
+        if plan.casts:
+            with instrumentation.phase(cls, instrumentation.CAST) as phase:
+                df = phase.frame = df.with_columns(plan.casts)
+
+        for exprs in plan.computed:
+            with instrumentation.phase(cls, instrumentation.CAST) as phase:
+                df = phase.frame = df.with_columns(exprs)
+
+        if plan.select is not None:
+            with instrumentation.phase(cls, instrumentation.SELECT) as phase:
+                df = phase.frame = df.select(plan.select)
+
+        if shrink and plan.shrink and isinstance(df, DataFrame):
+            with instrumentation.phase(cls, instrumentation.CAST) as phase:
+                df = phase.frame = cls._meta.columns.shrink(df, plan.shrink)
+
+        if plan.validation:
+            with instrumentation.phase(cls, instrumentation.VALIDATE) as phase:
+                df = phase.frame = cls._validate(df, plan.validation, quarantine)
+
+        return df
+
+    def _validate(cls, df: Union[DataFrame, LazyFrame], validation: ValidationPlan, quarantine: bool = True
+                  ) -> Union[DataFrame, LazyFrame]:
+        """
+        Runs the column validators, invalid rows raise `ValidationError` or, if the model has
+        `Meta.quarantine`, are removed and saved to the quarantine table (only removed if
+        `quarantine` is False).
+
+        On a LazyFrame the validation runs when it is collected. New data is validated whole,
+        since validators like `UniqueValidator` need every row. Data read from storage (when
+        `quarantine` is False) lets polars push the filters and projections of the query through
+        the validation down to the scan, so only the rows and columns the query reads are
+        validated, batch by batch in streaming queries.
+        """
+        if isinstance(df, LazyFrame):
+            if quarantine:
+                return df.map_batches(partial(cls._validate, validation=validation, quarantine=quarantine),
+                                      predicate_pushdown=False,
+                                      projection_pushdown=False,
+                                      slice_pushdown=False)
+
+            # Slices cannot go below the validation if it removes rows.
+            return df.map_batches(partial(cls._validate_read, validation=validation),
+                                  predicate_pushdown=True,
+                                  projection_pushdown=True,
+                                  slice_pushdown=not cls._meta.quarantine,
+                                  streamable=True)
+
+        if not cls._meta.quarantine:
+            return validation.validate(df)
+
+        df, invalid_df = validation.split(df)
+        if invalid_df is not None and quarantine:
+            cls._quarantine(invalid_df)
+        elif invalid_df is not None:
+            datasaurus_logger.debug(f'Removed {invalid_df.height} invalid rows of {cls} read from storage')
+
+        return df
+
+    def _validate_read(cls, df: DataFrame, validation: ValidationPlan) -> DataFrame:
+        """Runs the validators of the columns a query read from storage, see `_validate`."""
+        validation = validation.select(df.columns)
+        return cls._validate(df, validation, quarantine=False) if validation else df
+
+    def _quarantine(cls, invalid_df: DataFrame) -> None:
+        """
+        Appends the invalid rows to the `Meta.quarantine` table of the model's storage, with the
+        validators they failed and when. Formats that cannot be appended to are rewritten with
+        the rows already quarantined.
+        """
+        storage, format = cls._get_storage_and_format(None)
+        invalid_df = invalid_df.with_columns(
+            polars.col(ValidationPlan.FAILED_VALIDATORS_COLUMN).list.join(', '),
+            polars.lit(datetime.datetime.now()).alias('quarantined_at'),
+        )
+
+        datasaurus_logger.debug(f'Quarantining {invalid_df.height} invalid rows of {cls} in {cls._meta.quarantine}')
+
+        try:
+            storage.append_file(invalid_df, cls._meta.quarantine, format=format)
+        except (NotImplementedError, ValueError):
+            if storage.file_exists(cls._meta.quarantine, format):
+                quarantined = storage.read_file(cls._meta.quarantine, None, format=format)
+                invalid_df = polars.concat([quarantined, invalid_df], how='diagonal_relaxed')
+
+            storage.write_file(invalid_df, cls._meta.quarantine, format=format)
+
+    def _iter_batches(cls, batch_size: int, storage: Optional[Union[Storage, StorageGroup]] = None
+                      ) -> Iterator[DataFrame]:
+        """
+        Yields the model's data in validated and cast dataframes of at most `batch_size` rows.
+
+        Data read from storage is read in batches, data from the constructor or from
+        calculate_data is created whole and sliced.
+        """
+        cls._record_access()
+
+        if not cls._has_bound_data():
+            resolved_storage, format = cls._get_storage_and_format(storage)
+
+            if not cls._needs_calculation(resolved_storage, format):
+                batches = resolved_storage.iter_batches(cls._meta.table_name,
+                                                        cls._meta.columns.get_source_column_names(),
+                                                        format=format,
+                                                        batch_size=batch_size)
+                for batch in batches:
+                    # Every batch has the same dtypes, the saved ones or the default ones.
+                    batch = cls._cast_to_saved_dtypes(batch, resolved_storage, format)
+                    yield cls._apply_columns(batch, shrink=False, quarantine=False)
+                return
+
+        yield from cls._get_df(storage).iter_slices(batch_size)
+
+    def _get_save_target(cls, to: Optional[Union[Storage, StorageGroup]], format: Optional[DataFormat],
+                         table_name: Optional[str], environment: Optional[str]
+                         ) -> Tuple[Storage, Optional[DataFormat], str]:
+        """
+        Resolves the storage, format and table name the data of the model will be saved to.
+        """
+        storage = cls._get_storage_or_default(to, environment=environment)
+        format = cls._get_format_or_default(format)
+        table_name = table_name or cls._meta.table_name
 
         if isinstance(format, str):
             format = storage.supported_formats[format]
 
-        if format and not storage.supports_format(format):
-            raise ValueError(
+        if storage.needs_format and format and not storage.supports_format(format):
+            raise FormatNotSupportedByModelError(
                 f"Storage of type '{type(storage)}' does not support format '{format}',"
                 f" supported formats by this storage are '{storage.supported_formats}'"
             )
 
         if storage.needs_format and not format:
             raise FormatNeededError(
-                f"Cannot create Dataframe because storage of type '{type(storage)}'"
-                " needs a format and it was not provided in the Meta class or it could"
-                " not be inferred from the table_name attribute. To fix this add format "
-                " in the Model's Meta class or an extension to the table_name"
+                f"Cannot save Dataframe because storage of type '{type(storage)}'"
+                " needs a format and it was not provided"
             )
 
-        if cls._meta.recalculate == 'always' or (
-                cls._meta.recalculate == 'if_not_data_in_storage' and not storage.file_exists(
-                cls._meta.table_name, format)
-        ):
-            try:
-                df = cls.calculate_data(cls)
+        return storage, format, table_name
+
+    def _get_read_options(cls, format: Optional[DataFormat], eager: bool = False) -> dict:
+        """
+        Returns the hints of a read in `format`, the partition columns of file formats and, for
+        `eager` reads of csv files, the columns the reader can parse natively. They are only given
+        when there are any, so storages that do not take them are not bothered. Compressed IPC
+        files are not memory mapped.
+        """
+        options = {}
 
-            except NotImplementedError as e:
-                raise ValueError(
-                    'Cannot generate dataframe, either no data can be read from storage or '
-                    ' calculate_data is not defined in the model.') from e
+        read_parsers = cls._meta.columns.get_read_parsers() if eager and format == FileFormat.CSV else None
+        if read_parsers:
+            options['parsers'] = read_parsers
 
-            if not isinstance(df, DataFrame):
-                raise ValueError(
-                    f'Function calculate_data has to return a polars Dataframe, not a {type(df)}')
+        if cls._meta.partition_columns and isinstance(format, FileFormat):
+            options['partition_by'] = cls._meta.partition_columns
 
-        else:
-            df = storage.read_file(cls._meta.table_name,
-                                   cls._meta.columns.get_df_column_names(),
-                                   format=format)
+        if format == FileFormat.IPC and cls._meta.ipc_compression != 'uncompressed':
+            options['memory_map'] = False
 
-        return df
+        return options
+
+    def _get_write_options(cls, format: Optional[DataFormat], **kwargs) -> dict:
+        """
+        Returns the options of a write in `format`, the partition columns for file formats and for
+        parquet the options of `Meta.parquet_options` and the columns and for IPC the
+        `Meta.ipc_compression`, unless they are given in `kwargs`.
+        """
+        if cls._meta.partition_columns and isinstance(format, FileFormat):
+            kwargs = {'partition_by': cls._meta.partition_columns, **kwargs}
+
+        if format == FileFormat.IPC:
+            return {'compression': cls._meta.ipc_compression, **kwargs}
+
+        if format != FileFormat.PARQUET:
+            return kwargs
+
+        return {**cls._meta.columns.get_parquet_options(cls._meta.parquet_options), **kwargs}
+
+    def _write_to_target(cls, df: DataFrame, storage: Storage, format: Optional[DataFormat],
+                         table_name: str, **kwargs) -> None:
+        with instrumentation.phase(cls, instrumentation.WRITE) as phase:
+            phase.frame = df
+            storage.write_file(df, table_name, format=format, **cls._get_write_options(format, **kwargs))
+
+    def _get_targets(cls, to) -> Optional[List]:
+        """
+        Returns the targets of a save, the given ones or else `Meta.outputs`, None if there are
+        none. A target is a storage or a (storage, format) tuple, any other list or tuple is a
+        sequence of targets.
+        """
+        targets = to if to is not None else cls._meta.outputs or None
+
+        if targets is None:
+            return None
+
+        if not isinstance(targets, (list, tuple)) or (
+                isinstance(targets, tuple) and len(targets) == 2 and isinstance(targets[1], (DataFormat, str))):
+            return [targets]
+
+        return list(targets)
+
+    def _split_target(cls, target) -> Tuple[Union[Storage, StorageGroup], Optional[DataFormat]]:
+        """Returns the storage and the format of a target, the format is None if it has none."""
+        return target if isinstance(target, tuple) else (target, None)
+
+    def _save_to_targets(cls, targets: List, format: Optional[DataFormat], table_name: Optional[str],
+                         environment: Optional[str], **kwargs) -> None:
+        """
+        Computes the dataframe once and writes it to every target concurrently, a target is a
+        storage or a (storage, format) tuple.
+
+        Every target is written even if some fail, the failures are then raised together
+        in a `ModelSaveError`.
+        """
+        resolved_targets = []
+        for target in targets:
+            target_storage, target_format = cls._split_target(target)
+            resolved_targets.append(
+                cls._get_save_target(target_storage, target_format or format, table_name, environment)
+            )
+
+        df = cls._get_df()
+
+        def save_to_target(storage, format, table_name):
+            # Polars does not let several threads use the same dataframe, clones share the data.
+            cls._write_to_target(df.clone(), storage, format, table_name, **kwargs)
+
+            manifest = cls._get_manifest(df.schema)
+            if manifest:
+                storage.write_manifest(table_name, format, manifest)
+
+        with ThreadPoolExecutor(max_workers=len(resolved_targets) or None) as pool:
+            futures = [(target, pool.submit(save_to_target, *target)) for target in resolved_targets]
+
+        cls.invalidate()
+
+        errors = {target: future.exception() for target, future in futures if future.exception()}
+        if errors:
+            raise ModelSaveError(
+                f'{cls} could not be saved to {len(errors)} of {len(resolved_targets)} targets: '
+                + ', '.join(f'{storage}/{table_name} ({format}): {error!r}'
+                            for (storage, format, table_name), error in errors.items()),
+                errors=errors,
+            )
+
+    def _record_access(cls) -> None:
+        accessed_models = _accessed_models.get()
+        if accessed_models is not None:
+            accessed_models.add(cls)
 
     def _get_df(cls, storage: Optional[Union[Storage, StorageGroup]] = None):
         """
@@ -262,44 +854,78 @@ class ModelMeta(PreparedMeta):
          The order is important, specially with column creation and validation, since if we try
          to validate BEFORE the column creation, we can have 'missing columns'
 
+         If `Meta.cache` is set the resulting dataframe is memoized, see `Model.invalidate`.
+         Inside a `ModelScheduler` run the dataframe is the one materialized by the run.
+
         """
-        df = cls._create_df(storage=storage)
+        cls._record_access()
 
+        run = current_run.get()
+        if run is not None and storage is None:
+            df = run.materialize(cls)
+            if df is not None:
+                return df
 
-        # Column validation.
-        columns_from_model = frozenset(cls._meta.columns.get_df_column_names())
+        cache = cls._get_cache()
 
-        missing_columns = columns_from_model.difference(
-            df.columns
-        )
+        if cache is None or cls._has_bound_data():
+            return cls._create_df(storage=storage)
 
-        if missing_columns:
-            raise ValueError(
-                f"Dataframe columns do not match. Missing columns: {missing_columns}, df.columns: {df.columns},"
-                f" model.columns: {cls._meta.columns.get_df_column_names()}"
-            )
+        return cache.get_or_load(cls._get_cache_key(storage), lambda: cls._create_df(storage=storage))
 
-        # Column dtype casting.
-        columns_with_dtypes = cls._meta.columns.get_df_columns_polars(df.schema)
-        df = df.with_columns(columns_with_dtypes)
+    def _get_lf(cls, storage: Optional[Union[Storage, StorageGroup]] = None,
+                lookups: Optional[List[Lookup]] = None,
+                predicates: Optional[List[polars.Expr]] = None) -> LazyFrame:
+        """
+        Same as `_get_df` but returns a LazyFrame, the read is done with the storage's scan
+        and the column validation, casting and filtering are added as lazy steps.
 
-        df = df.select(cls._meta.columns.get_df_column_names())
+        Nothing is read until the LazyFrame is collected, which lets polars push projections
+        and predicates down to the scan.
 
-        return df
+        `lookups` and `predicates` are only pushed down to the storage, the caller is expected to
+        filter the LazyFrame by them, see `Model.filter`.
+        """
+        cls._record_access()
+
+        run = current_run.get()
+        if run is not None and storage is None:
+            df = run.materialize(cls)
+            if df is not None:
+                return df.lazy()
+
+        return cls._create_df(storage=storage, lazy=True, lookups=lookups, predicates=predicates)
+
+
+def _rebuild_row(model: ModelMeta, values: dict) -> 'Model':
+    return model(**values)
 
 
 class Model(metaclass=ModelMeta):
     _meta: ModelMetaOptions  # Defined to have autocompletion.
+    _row_class: ModelMeta
+    _column_names: frozenset = frozenset()
+
+    def __new__(cls, **kwargs):
+        return object.__new__(getattr(cls, '_row_class', cls))
 
     def __init__(self, **kwargs):
+        if not self._column_names.issuperset(kwargs):
+            column = next(column for column in kwargs if column not in self._column_names)
+            raise ColumnNotExistsError(
+                f"{self} does not have column '{column}', columns are: {self.columns}")
+
         for column, column_value in kwargs.items():
-            if column not in self._meta.columns.get_model_columns():
-                raise ColumnNotExistsError(
-                    f"{self} does not have column '{column}', columns are: {self.columns}")
             setattr(self, column, column_value)
 
         super().__init__()
 
+    def __reduce__(self):
+        # The row class is not importable, the instance is pickled as the model and its values.
+        return _rebuild_row, (self._meta.model, {
+            column: getattr(self, column) for column in self._column_names if hasattr(self, column)
+        })
+
     def __str__(self):
         cls_name = self.__class__.__qualname__
         return f'<{cls_name}: {cls_name} object({", ".join(self.columns)})>'
@@ -325,58 +951,254 @@ class Model(metaclass=ModelMeta):
 
     @classmethod
     def from_data(cls, data: FrameInitTypes, schema: SchemaDefinition = None):
-        if not data:
+        """
+        Uses the given data the next time the model's dataframe is created, instead of
+        calculating it or reading it from the storage.
+
+        The data is bound to the current context (thread, asyncio task..), so several threads can
+        build the same model from different data at the same time. A polars DataFrame without
+        schema is used as is, without copying it.
+
+        ```
+        Examples:
+            >>> MyModel.from_data({'col1': ['a', 'b'], 'col2': [1, 2]}).save()
+        ```
+        """
+        if data is None or (not isinstance(data, DataFrame) and not data):
             raise ValueError('Data cannot be None')
 
-        cls._data_from_cls = data
-        cls._schema = schema
+        cls._bind_data(data, schema)
 
         return cls
 
-    def calculate_data(self) -> 'polars.DataFrame':
+    @classmethod
+    def lazy(cls, storage: Optional[Union[Storage, StorageGroup]] = None) -> LazyFrame:
+        """
+        Returns the model's data as a polars LazyFrame, see `Model.lf`.
+
+        Parameters:
+            storage:
+                The storage to read from, if not provided the Meta's will be used.
+
+        ```
+        Examples:
+            >>> MyModel.lazy().filter(MyModel.col1 == 'a').collect()
+        ```
+        """
+        return cls._get_lf(storage)
+
+    @classmethod
+    def as_batch(cls, storage: Optional[Union[Storage, StorageGroup]] = None) -> ModelBatch:
+        """
+        Returns the model's data as a `ModelBatch`, rows of the model that are only built when
+        they are accessed.
+
+        ```
+        Examples:
+            >>> for commit in GithubCommit.as_batch():
+            ...     print(commit.author)
+        ```
+        """
+        return ModelBatch(cls, cls._get_df(storage))
+
+    @classmethod
+    def filter(cls, *predicates: polars.Expr,
+               storage: Optional[Union[Storage, StorageGroup]] = None,
+               **lookups) -> DataFrame:
+        """
+        Returns the rows of the model that match all the predicates and lookups.
+
+        Predicates are polars expressions, they are pushed down by polars to the file scans, for
+        parquet files that means skipping the row groups that cannot match by their statistics.
+        Predicates and lookups on the partition columns of partitioned models also skip the
+        partitions that cannot match, filters on `Model.lf` do not.
+
+        Lookups are django-like 'column__operator=value' (eq, ne, gt, gte, lt, lte, in, isnull),
+        besides the file scans they are also pushed down to SQL storages as a parameterized
+        WHERE clause. Lookups on computed columns are only applied after the read, the storage
+        does not have them.
+
+        Parameters:
+            predicates:
+                Polars expressions, for example `Model.column == 'x'`.
+            storage:
+                The storage to read from, if not provided the Meta's will be used.
+            lookups:
+                Lookups by the model's column names.
+
+        ```
+        Examples:
+            >>> GithubCommit.filter(GithubCommit.repo == 'polars')
+            >>> GithubCommit.filter(repo='polars', date__gte=datetime.datetime(2023, 1, 1))
+        ```
+        """
+        columns = [
+            (cls._meta.columns.get_column(lookup.column), lookup)
+            for lookup in map(Lookup.from_kwarg, lookups.keys(), lookups.values())
+        ]
+        lookups = [Lookup(column.get_column_name(), lookup.operator, lookup.value) for column, lookup in columns]
+        stored_lookups = [lookup for (column, _), lookup in zip(columns, lookups) if column.expr is None]
+
+        lf = cls._get_lf(storage, lookups=stored_lookups, predicates=list(predicates))
+
+        predicates = [*predicates, *(lookup.to_polars() for lookup in lookups)]
+        return (lf.filter(predicates) if predicates else lf).collect()
+
+    @classmethod
+    def where(cls, storage: Optional[Union[Storage, StorageGroup]] = None, **lookups) -> DataFrame:
+        """
+        Same as `Model.filter` with only lookups.
+
+        ```
+        Examples:
+            >>> GithubCommit.where(repo='polars', author__in=['a', 'b'])
+        ```
+        """
+        return cls.filter(storage=storage, **lookups)
+
+    @classmethod
+    def iter_batches(cls, batch_size: int = 50_000,
+                     storage: Optional[Union[Storage, StorageGroup]] = None) -> Iterator[DataFrame]:
+        """
+        Iterates over the model's data in dataframes of at most `batch_size` rows, with the same
+        column selection and dtype enforcement as `Model.df` but without loading all the data.
+
+        Parameters:
+            batch_size:
+                Max number of rows of every dataframe.
+            storage:
+                The storage to read from, if not provided the Meta's will be used.
+
+        ```
+        Examples:
+            >>> for batch in GithubCommit.iter_batches(100_000):
+            ...     export(batch)
+        ```
+        """
+        return cls._iter_batches(batch_size, storage)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """
+        Drops the cached dataframes of the model, the next `Model.df` will load it again.
+
+        Cached dataframes are already reloaded when the source file changes, this is needed when
+        the model's data comes from `calculate_data` or from storages that cannot tell whether
+        their data changed (like SQL ones).
+        """
+        cache = cls._get_cache()
+        if cache is not None:
+            cache.invalidate(cls)
+
+    def calculate_data(self, **kwargs) -> Union['polars.DataFrame', 'polars.LazyFrame']:
+        """
+        Returns the data of the model, overwrite it in models whose data is derived from others.
+
+        Incremental models (with `Meta.watermark`) receive a `watermark` argument, the last
+        persisted value of the watermark column, and should only return newer rows.
+
+        ```
+        Examples:
+            >>> class GithubCommit(Model):
+            ...     date = DateTimeColumn()
+            ...
+            ...     class Meta:
+            ...         watermark = 'date'
+            ...
+            ...     def calculate_data(self, watermark=None):
+            ...         return RawCommits.lf.filter(pl.col('date') > watermark) if watermark else RawCommits.lf
+        ```
+        """
         raise NotImplementedError()
 
     @classmethod
     def save(cls,
-             to: 'Storage' = None,
+             to: Union['Storage', List] = None,
              format: DataFormat = None,
              table_name: str = None,
              environment: str = None,
+             streaming: bool = False,
              **kwargs):
 
         """
         Saves the dataframe to storage.
 
+        If the model has `Meta.watermark` the save is incremental, calculate_data receives the max
+        value of the watermark column already saved (None the first time) and the rows it returns
+        are appended to the storage instead of rewriting it.
+
+        To save to several storages or formats at once pass a list or tuple of them to `to` or set
+        `Meta.outputs`, the dataframe is then computed once and written to every target
+        concurrently, see `ModelSaveError` for the targets that fail.
+
         Parameters:
             to:
-                The storage to save the dataframe to, if not provided the Meta's will be used.
+                The storage to save the dataframe to, if not provided `Meta.outputs` or the Meta's
+                storage will be used. A list or tuple of storages or (storage, format) tuples saves to all of them.
             format:
                 The format to store the data into, not always needed for example in SQL databases.
             table_name:
                 The table name or file name that will be saved to, if not provided the Meta's will be used.
             environment:
                 The environment name/key that will be used, if not provided the default or Meta's will be used.
+            streaming:
+                Whether to run the read, casts and select with the polars streaming engine and sink
+                the result into the storage, the peak memory is then bounded by the batch size
+                instead of the size of the data.
 
         Returns:
             (None):
 
+        Examples:
+            >>> GithubCommit.save(to=[CommitsStorage.analytics, (CommitsStorage.partner, FileFormat.CSV)])
+
         """
-        storage = cls._get_storage_or_default(to, environment=environment)
-        format = cls._get_format_or_default(format)
-        table_name = table_name or cls._meta.table_name
+        targets = cls._get_targets(to)
 
-        if storage.needs_format and format and not storage.supports_format(format):
-            raise FormatNotSupportedByModelError(
-                f"Storage of type '{type(storage)}' does not support format '{format}',"
-                f" supported formats by this storage are '{storage.supported_formats}'"
-            )
+        if targets is not None and len(targets) != 1:
+            if not targets:
+                raise ValueError(f'{cls} cannot be saved to an empty list of targets')
 
-        if storage.needs_format and not format:
-            raise FormatNeededError(
-                f"Cannot save Dataframe because storage of type '{type(storage)}'"
-                " needs a format and it was not provided"
-            )
+            if cls._meta.watermark or streaming:
+                raise ValueError('Incremental and streaming saves can only be done to one target')
 
-        df = cls._get_df()
+            cls._save_to_targets(targets, format, table_name, environment, **kwargs)
+            return
+
+        if targets:
+            to, target_format = cls._split_target(targets[0])
+            format = target_format or format
+
+        storage, format, table_name = cls._get_save_target(to, format, table_name, environment)
+        schema = None
+
+        if cls._meta.watermark:
+            watermark = cls._get_watermark(storage, format, table_name)
+            datasaurus_logger.debug(f'Calculating {cls} incrementally from watermark {watermark}')
+
+            df = cls._calculate_data(watermark=watermark)
+            df = cls._apply_columns(df.collect() if isinstance(df, LazyFrame) else df)
+
+            if df.is_empty():
+                datasaurus_logger.debug(f'No new rows for {cls}, nothing to append')
+            else:
+                with instrumentation.phase(cls, instrumentation.WRITE) as phase:
+                    phase.frame = df
+                    storage.append_file(df, table_name, format=format, **cls._get_write_options(format, **kwargs))
+
+        elif streaming:
+            lf = cls._get_lf()
+            schema = lf.schema
+            with instrumentation.phase(cls, instrumentation.WRITE):
+                storage.sink_file(lf, table_name, format=format, **cls._get_write_options(format, **kwargs))
+
+        else:
+            df = cls._get_df()
+            schema = df.schema
+            cls._write_to_target(df, storage, format, table_name, **kwargs)
+
+        manifest = cls._get_manifest(schema)
+        if manifest:
+            storage.write_manifest(table_name, format, manifest)
 
-        storage.write_file(df, table_name, format=format, **kwargs)
+        cls.invalidate()
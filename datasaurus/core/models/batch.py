@@ -0,0 +1,60 @@
+from collections.abc import Sequence
+from typing import Iterable, Iterator, Union
+
+import polars
+
+
+class ModelBatch(Sequence):
+    """
+    Rows of a model over a dataframe, the data stays columnar and the row objects are only built
+    when they are accessed.
+
+    Examples
+    --------
+
+        >>> batch = ModelBatch(GithubCommit, GithubCommit.df)
+        >>> batch[0].author
+        'surister'
+        >>> [commit.repo for commit in batch[:10]]
+    """
+    __slots__ = ('model', 'df', '_names', '_row_class')
+
+    def __init__(self, model, df: polars.DataFrame):
+        columns = model._meta.columns
+        df_column_names = columns.get_df_column_names()
+
+        self.model = model
+        self.df = df if df.columns == df_column_names else df.select(df_column_names)
+        self._names = columns.get_model_columns()
+        self._row_class = model._row_class
+
+    @classmethod
+    def from_rows(cls, model, rows: Iterable) -> 'ModelBatch':
+        """Builds the batch from row objects of the model, columns that were not set are null."""
+        rows = list(rows)
+        return cls(model, polars.DataFrame({
+            column.get_column_name(): [getattr(row, column.name, None) for row in rows]
+            for column in model._meta.columns
+        }))
+
+    def _make_row(self, values: tuple):
+        # Values are in the order of the columns, there is nothing to validate.
+        row = object.__new__(self._row_class)
+        for name, value in zip(self._names, values):
+            setattr(row, name, value)
+        return row
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return ModelBatch(self.model, self.df[index])
+        return self._make_row(self.df.row(index))
+
+    def __iter__(self) -> Iterator:
+        for values in self.df.iter_rows():
+            yield self._make_row(values)
+
+    def __len__(self) -> int:
+        return self.df.height
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}({self.model.__qualname__}, rows={len(self)})'
@@ -0,0 +1,131 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from polars import DataFrame
+
+from datasaurus.core.loggers import datasaurus_logger
+
+DEFAULT_CACHE_MAX_BYTES = int(os.getenv('DATASAURUS_CACHE_MAX_BYTES', 1024 ** 3))
+
+
+class _Load:
+    """A load in progress, the threads waiting for it get its dataframe when they get the lock."""
+    __slots__ = ('lock', 'df')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.df: Optional[DataFrame] = None
+
+
+class ModelCache:
+    """
+    LRU cache of model dataframes bounded by their estimated size in bytes.
+
+    Loading is single-flight: if several threads ask for the same missing key at the same
+    time only one of them calls the loader, the rest wait and get its dataframe, even if it is
+    too big to be cached.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Budget of the cache, when it is exceeded the least recently used dataframes are
+        evicted. Dataframes bigger than the budget are never cached.
+
+    Notes
+    -----
+    Keys are expected to be tuples whose first element is the model, that's what
+    `invalidate` uses to drop every entry of a model.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+
+        self._entries: 'OrderedDict[Tuple, Tuple[DataFrame, int]]' = OrderedDict()
+        self._loading: Dict[Tuple, _Load] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple) -> Optional[DataFrame]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: Tuple, df: DataFrame) -> None:
+        df_size = df.estimated_size()
+
+        if df_size > self.max_bytes:
+            datasaurus_logger.debug(
+                f'Not caching {key}, its size {df_size} is bigger than the cache budget {self.max_bytes}')
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = (df, df_size)
+            self.size += df_size
+
+            while self.size > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                datasaurus_logger.debug(f'Evicted {evicted_key} from cache')
+
+    def _pop(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def get_or_load(self, key: Tuple, loader: Callable[[], DataFrame]) -> DataFrame:
+        """
+        Returns the dataframe cached under `key`, calling `loader` to create it if it is missing.
+        """
+        with self._lock:
+            df = self._get(key)
+            if df is not None:
+                return df
+
+            load = self._loading.setdefault(key, _Load())
+
+        with load.lock:
+            if load.df is not None:
+                # Another thread loaded it while we were waiting, it may not be cached.
+                return load.df
+
+            with self._lock:
+                df = self._get(key)
+
+            if df is not None:
+                return df
+
+            try:
+                df = load.df = loader()
+                self._put(key, df)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+
+        return df
+
+    def invalidate(self, model: Optional[Hashable] = None) -> None:
+        """
+        Drops every entry of the given model, if no model is given the whole cache is cleared.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if model is None or key[0] is model:
+                    self._pop(key)
+
+    def __contains__(self, key: Tuple) -> bool:
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}(entries={len(self)}, size={self.size}, max_bytes={self.max_bytes})'
+
+
+model_cache = ModelCache()
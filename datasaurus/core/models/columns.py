@@ -1,9 +1,11 @@
 from collections.abc import Collection
 
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict, Union
 
 import polars
 
+from datasaurus.core.models.validators import Validator, ValidationPlan
+
 ColumnName = str
 
 
@@ -19,15 +21,37 @@ class Column:
     supported_dtypes = []
     cast_map = {}
 
+    # Whether the column can pick the narrowest dtype that fits its data, see `get_shrunk_dtype`.
+    shrinkable = False
+
+    # Parquet write options that can be set per column, see `Columns.get_parquet_options`.
+    PARQUET_OPTIONS = frozenset(['compression', 'compression_level', 'statistics', 'dictionary'])
+
     def __init__(self,
                  name: Optional[str] = None,
                  enforce_dtype: bool = True,
-                 dtype: Optional[type(polars.DataType)] = None,
+                 dtype: Optional[Union[type(polars.DataType), str]] = None,
+                 validators: Optional[List[Validator]] = None,
+                 expr: Optional[polars.Expr] = None,
+                 parquet_options: Optional[Dict[str, Any]] = None,
                  *args,
                  **kwargs):
         self.column_name = name
         self.enforce_dtype = enforce_dtype
-        self.dtype = dtype
+        self.auto_dtype = dtype == 'auto'
+        self.dtype = None if self.auto_dtype else dtype
+        self.validators = validators or []
+
+        # Computed columns are not read, they are computed from the other columns, see `get_computed_expr`.
+        self.expr = expr
+        self.parquet_options = parquet_options or {}
+
+        unknown_options = set(self.parquet_options).difference(self.PARQUET_OPTIONS)
+        if unknown_options:
+            raise ValueError(f'Invalid parquet options {unknown_options}, options are: {set(self.PARQUET_OPTIONS)}')
+
+        if self.auto_dtype and not self.shrinkable:
+            raise ValueError(f"{type(self)} does not support dtype='auto'")
 
         #  Descriptor variables.
         self.name = None
@@ -110,6 +134,33 @@ class Column:
 
         return col.cast(target_dtype)
 
+    def get_computed_expr(self) -> polars.Expr:
+        """Returns the expression of a computed column, named and cast to the column's dtype."""
+        expr = self.expr.alias(self.get_column_name())
+
+        if self.enforce_dtype:
+            expr = expr.cast(self.dtype or self.default_dtype)
+
+        return expr
+
+    def get_read_parser(self) -> Optional[polars.Expr]:
+        """
+        Returns the strict parse of the column's strings if storages that parse while reading
+        (like the csv reader) can parse them natively, None if the column is cast afterwards.
+        """
+        return None
+
+    def get_shrink_stats(self, col: polars.Expr) -> Dict[str, polars.Expr]:
+        """
+        Returns the aggregations `get_shrunk_dtype` needs, they are computed together with the
+        ones of the other columns in a single pass.
+        """
+        return {}
+
+    def get_shrunk_dtype(self, stats: Dict[str, object]) -> polars.DataType:
+        """Returns the narrowest supported dtype that fits the data described by `stats`."""
+        return self.default_dtype
+
     def get_column_name(self):
         """Returns the defined `column_name` or the name from __set_name__"""
         return self.column_name or self.name
@@ -122,6 +173,70 @@ class Column:
                f' dtype={self.dtype or self.default_dtype}>'
 
 
+class CastPlan:
+    """
+    The casts and the selection needed to turn a dataframe with a given schema into one that
+    matches the columns, compiled once by `Columns.get_plan`.
+
+    Attributes
+    ----------
+    casts : List[polars.Expr]
+        The expressions of the columns whose dtype has to be cast and of the computed columns that
+        only use columns that are not cast, evaluated together in one pass, empty if none.
+
+    computed : List[List[polars.Expr]]
+        The computed columns that use cast or other computed columns, in the passes that follow
+        the casts so they see their final values.
+
+    select : Optional[List[str]]
+        The columns to select, None if the dataframe already has exactly the columns in order.
+
+    validation : ValidationPlan
+        The validators of the columns, run on the cast and selected dataframe.
+
+    shrink : List[Column]
+        The columns whose narrowest dtype has to be computed from the data, see `Columns.shrink`.
+    """
+    __slots__ = ('casts', 'select', 'validation', 'shrink', 'computed')
+
+    def __init__(self, casts: List[polars.Expr], select: Optional[List[str]],
+                 validation: Optional[ValidationPlan] = None, shrink: Optional[List[Column]] = None,
+                 computed: Optional[List[List[polars.Expr]]] = None):
+        self.casts = casts
+        self.select = select
+        self.validation = validation or ValidationPlan([])
+        self.shrink = shrink or []
+        self.computed = computed or []
+
+    @property
+    def is_noop(self) -> bool:
+        return (not self.casts and not self.computed and self.select is None and not self.validation
+                and not self.shrink)
+
+    def apply(self, df):
+        """
+        Applies the plan to a DataFrame or LazyFrame, validators are run on DataFrames only and
+        raise `ValidationError` if any row is invalid.
+        """
+        if self.casts:
+            df = df.with_columns(self.casts)
+
+        for exprs in self.computed:
+            df = df.with_columns(exprs)
+
+        if self.select is not None:
+            df = df.select(self.select)
+
+        if self.validation and isinstance(df, polars.DataFrame):
+            df = self.validation.validate(df)
+
+        return df
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}(casts={self.casts}, computed={self.computed}, select={self.select}, ' \
+               f'validation={[label for label, _ in self.validation.checks]})'
+
+
 class Columns(Collection):
     """
     Container for columns. Used for column filtering and general columns operations.
@@ -132,9 +247,20 @@ class Columns(Collection):
     One `Columns` object per Model is expected but not enforced.
     """
 
-    def __init__(self, initial_columns: List[Column] = None):
+    MAX_PLANS = 64
+
+    # Parquet write options that can be set per model, see `get_parquet_options`.
+    PARQUET_OPTIONS = Column.PARQUET_OPTIONS.union(['row_group_size'])
+
+    def __init__(self, initial_columns: List[Column] = None, shrink_dtypes: bool = False):
         self._columns = initial_columns or []
 
+        # Whether every shrinkable column behaves as if it had dtype='auto'.
+        self.shrink_dtypes = shrink_dtypes
+
+        # Compiled plans by source schema, see get_plan.
+        self._plans: Dict[tuple, CastPlan] = {}
+
     def __getitem__(self, item):
         return self._columns[item]
 
@@ -155,6 +281,7 @@ class Columns(Collection):
 
     def extend(self, other: 'Columns') -> None:
         self._columns.extend(other._columns)
+        self._plans.clear()
 
     def get_df_column_names(self) -> List[str]:
         """
@@ -199,6 +326,212 @@ class Columns(Collection):
             for column in self._columns
         ]
 
+    def get_column(self, name: str) -> Column:
+        """
+        Returns the column by its name in the Model, raises ValueError if it does not exist.
+        """
+        for column in self._columns:
+            if column.name == name:
+                return column
+        raise ValueError(f"Column '{name}' does not exist, columns are: {self.get_model_columns()}")
+
+    def compile_plan(self, current_dtypes: Dict[ColumnName, polars.DataType]) -> CastPlan:
+        """
+        Validates that all the columns exist in the given schema and builds the casts and the
+        selection needed, only the columns whose dtype differs get a cast and the selection is
+        skipped if the schema already has exactly the columns in the same order.
+
+        Computed columns are computed in the same pass as the casts, unless they use a cast or
+        a computed column, then in a pass after the one that gives it its final value. Computed
+        columns can only use the computed columns defined before them.
+        """
+        column_names = self.get_df_column_names()
+
+        missing_columns = frozenset(self.get_source_column_names()).difference(current_dtypes)
+
+        if missing_columns:
+            raise ValueError(
+                f"Dataframe columns do not match. Missing columns: {missing_columns},"
+                f" df.columns: {list(current_dtypes)}, model.columns: {column_names}"
+            )
+
+        casts, shrink = [], []
+        auto_columns = self.get_auto_dtype_columns()
+
+        # The pass after which every cast or computed column has its final value.
+        final_after = {}
+
+        for column in self._columns:
+            if not column.enforce_dtype or column.expr is not None:
+                continue
+
+            current_dtype = current_dtypes[column.get_column_name()]
+
+            if column in auto_columns:
+                if current_dtype in column.supported_dtypes and current_dtype != column.default_dtype:
+                    # Already narrow, like data saved shrunk to parquet.
+                    continue
+                shrink.append(column)
+
+            # Always called, as it also validates that the column can be cast.
+            col = column.get_col_with_dtype(current_dtype)
+
+            if (column.dtype or column.default_dtype) != current_dtype:
+                casts.append(col)
+                final_after[column.get_column_name()] = 1
+
+        passes = [casts]
+        new_columns = []
+        for column in self.get_computed_columns():
+            n_pass = max((final_after.get(name, 0) for name in column.expr.meta.root_names()), default=0)
+
+            if n_pass == len(passes):
+                passes.append([])
+
+            passes[n_pass].append(column.get_computed_expr())
+            final_after[column.get_column_name()] = n_pass + 1
+
+            if column.get_column_name() not in current_dtypes:
+                new_columns.append((n_pass, column.get_column_name()))
+
+            if column in auto_columns:
+                shrink.append(column)
+
+        # with_columns adds the new columns at the end, pass by pass.
+        result_columns = list(current_dtypes) + [name for _, name in sorted(new_columns, key=lambda item: item[0])]
+        select = None if result_columns == column_names else column_names
+
+        return CastPlan(casts, select, self.compile_validation(), shrink, computed=passes[1:])
+
+    def compile_validation(self) -> ValidationPlan:
+        """Returns the validators of all the columns as a single `ValidationPlan`."""
+        return ValidationPlan([
+            (f'{column.name}:{validator.name}',
+             validator.get_valid_expr(polars.col(column.get_column_name())))
+            for column in self._columns
+            for validator in column.validators
+        ])
+
+    def get_plan(self, current_dtypes: Dict[ColumnName, polars.DataType]) -> CastPlan:
+        """
+        Returns the `CastPlan` for the given schema, compiling it only the first time the
+        schema is seen.
+
+        Notes
+        -----
+        Plans are cached in the `Columns`, if a column is modified after a plan was compiled
+        `clear_plans` has to be called.
+        """
+        key = tuple(current_dtypes.items())
+
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self.compile_plan(current_dtypes)
+
+            if len(self._plans) >= self.MAX_PLANS:
+                self._plans.clear()
+            self._plans[key] = plan
+
+        return plan
+
+    def clear_plans(self) -> None:
+        self._plans.clear()
+
+    def get_read_parsers(self) -> Dict[ColumnName, polars.Expr]:
+        """Returns the parsers of the columns that can be parsed while reading, see `Column.get_read_parser`."""
+        return {
+            column.get_column_name(): column.get_read_parser()
+            for column in self._columns
+            if column.enforce_dtype and column.expr is None and column.get_read_parser() is not None
+        }
+
+    def get_parquet_options(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns the keyword arguments of `polars.DataFrame.write_parquet` for the parquet `options`
+        of the model and the ones of its columns, column options take precedence.
+
+        Polars' writer is used unless a column has options or dictionary encoding is set, those
+        need the pyarrow writer, which takes the codec, level, statistics and dictionary encoding
+        of every column.
+
+        Examples
+        --------
+
+        >>> columns.get_parquet_options({'compression': 'zstd', 'row_group_size': 100_000})
+        {'compression': 'zstd', 'row_group_size': 100000}
+        """
+        column_options = {
+            column.get_column_name(): column.parquet_options for column in self._columns if column.parquet_options
+        }
+
+        if not column_options and 'dictionary' not in options:
+            return dict(options)
+
+        names = self.get_df_column_names()
+
+        def get_option(name: str, option: str, default: Any) -> Any:
+            return column_options.get(name, {}).get(option, options.get(option, default))
+
+        levels = {name: get_option(name, 'compression_level', None) for name in names}
+
+        write_options = {
+            'use_pyarrow': True,
+            # Same defaults as polars' writer, pyarrow calls 'uncompressed' 'none'.
+            'compression': {
+                name: 'none' if codec == 'uncompressed' else codec
+                for name, codec in ((name, get_option(name, 'compression', 'zstd')) for name in names)
+            },
+            'compression_level': {name: level for name, level in levels.items() if level is not None} or None,
+            'statistics': [name for name in names if get_option(name, 'statistics', False)],
+            'pyarrow_options': {'use_dictionary': [name for name in names if get_option(name, 'dictionary', True)]},
+        }
+
+        if 'row_group_size' in options:
+            write_options['row_group_size'] = options['row_group_size']
+
+        return write_options
+
+    def get_computed_columns(self) -> List[Column]:
+        """Returns the columns that are computed from the other columns, see `Column.expr`."""
+        return [column for column in self._columns if column.expr is not None]
+
+    def get_source_column_names(self) -> List[str]:
+        """
+        Returns the columns that are read from the storage or given as data, every column but the
+        computed ones.
+        """
+        return [column.get_column_name() for column in self._columns if column.expr is None]
+
+    def get_auto_dtype_columns(self) -> List[Column]:
+        """Returns the columns whose dtype is the narrowest that fits their data."""
+        return [
+            column for column in self._columns
+            if column.auto_dtype or (self.shrink_dtypes and column.shrinkable and not column.dtype)
+        ]
+
+    def shrink(self, df: polars.DataFrame, columns: List[Column]) -> polars.DataFrame:
+        """
+        Casts the given columns to the narrowest dtype that fits their data, the statistics of all
+        the columns are computed in a single pass.
+        """
+        exprs = [
+            expr.alias(f'{column.get_column_name()}:{stat}')
+            for column in columns
+            for stat, expr in column.get_shrink_stats(polars.col(column.get_column_name())).items()
+        ]
+        stats = df.select(exprs).row(0, named=True) if exprs else {}
+
+        casts = []
+        for column in columns:
+            name = column.get_column_name()
+            dtype = column.get_shrunk_dtype({
+                stat: stats[f'{name}:{stat}'] for stat in column.get_shrink_stats(polars.col(name))
+            })
+            if dtype != df.schema[name]:
+                casts.append(polars.col(name).cast(dtype))
+
+        return df.with_columns(casts) if casts else df
+
     def get_model_columns(self) -> list[Column]:
         """
         Returns the list of columns as defined in the Model, they might actually not be
@@ -242,32 +575,221 @@ class IntegerColumn(Column):
     supported_dtypes = [polars.UInt8, polars.UInt16, polars.UInt32, polars.UInt64, polars.Int8,
                         polars.Int16, polars.Int32, polars.Int64]
     default_dtype = polars.Int64
+    shrinkable = True
+
+    # From the narrowest, signed first.
+    dtype_ranges = [
+        (polars.Int8, -2 ** 7, 2 ** 7 - 1),
+        (polars.UInt8, 0, 2 ** 8 - 1),
+        (polars.Int16, -2 ** 15, 2 ** 15 - 1),
+        (polars.UInt16, 0, 2 ** 16 - 1),
+        (polars.Int32, -2 ** 31, 2 ** 31 - 1),
+        (polars.UInt32, 0, 2 ** 32 - 1),
+        (polars.Int64, -2 ** 63, 2 ** 63 - 1),
+        (polars.UInt64, 0, 2 ** 64 - 1),
+    ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def get_shrink_stats(self, col: polars.Expr) -> Dict[str, polars.Expr]:
+        return {'min': col.min(), 'max': col.max()}
+
+    def get_shrunk_dtype(self, stats: Dict[str, object]) -> polars.DataType:
+        if stats['min'] is None:
+            return self.default_dtype
+
+        for dtype, min_value, max_value in self.dtype_ranges:
+            if dtype in self.supported_dtypes and min_value <= stats['min'] and stats['max'] <= max_value:
+                return dtype
+
+        return self.default_dtype
+
 
 class FloatColumn(Column):
     supported_dtypes = [polars.Float32, polars.Float64, polars.Decimal]
     default_dtype = polars.Float64
+    shrinkable = True
+
+    def get_shrink_stats(self, col: polars.Expr) -> Dict[str, polars.Expr]:
+        # Float32 is only used if no value loses precision.
+        return {'fits_float32': (col.cast(polars.Float32).cast(polars.Float64) == col).all()}
+
+    def get_shrunk_dtype(self, stats: Dict[str, object]) -> polars.DataType:
+        return polars.Float32 if stats['fits_float32'] else self.default_dtype
+
+
+class CategoricalColumn(Column):
+    """
+    Low cardinality strings dictionary encoded: every distinct value is stored once and every row
+    only has an integer index to it, parquet and ipc files keep the dictionary.
+
+    Categoricals from different dataframes can only be joined or compared if they were created
+    under the same string cache, read and join them inside `polars.StringCache()`. Set
+    `use_global_string_cache` to True to enable the polars global string cache, for the whole
+    process, when a model with a categorical column is defined.
+
+    Parameters
+    ----------
+    ordering : str
+        'physical' sorts by the order the values were seen, 'lexical' by the values.
+    """
+    supported_dtypes = [polars.Categorical]
+    default_dtype = polars.Categorical
+    use_global_string_cache = False
+
+    def __init__(self, ordering: str = 'physical', *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ordering = ordering
+        self.default_dtype = polars.Categorical(ordering)
+
+    def __set_name__(self, owner, name):
+        super().__set_name__(owner, name)
+
+        if self.use_global_string_cache and not polars.using_string_cache():
+            polars.enable_string_cache()
+
+
+class EnumColumn(Column):
+    """
+    Strings from a fixed set of `categories`, dictionary encoded like `CategoricalColumn` but
+    without needing a string cache, values not in `categories` fail the cast.
+    """
+    default_dtype = polars.Enum
+
+    def __init__(self, categories: List[str], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.categories = list(categories)
+        self.default_dtype = polars.Enum(self.categories)
+        self.supported_dtypes = [self.default_dtype]
+
+    def get_col_with_dtype(self, current_dtype: polars.DataType):
+        # Casting a categorical to an enum loses the column name in polars 0.20.
+        return super().get_col_with_dtype(current_dtype).alias(self.get_column_name())
+
+
+def _get_dtype(column_or_dtype: Union[Column, polars.DataType]) -> polars.DataType:
+    if isinstance(column_or_dtype, Column):
+        return column_or_dtype.dtype or column_or_dtype.default_dtype
+    return column_or_dtype
+
+
+class StructColumn(Column):
+    """
+    Nested records, the dtype of every field is given by a column (or a polars dtype) so structs
+    can have lists and other structs inside. Strings are decoded as JSON in a single pass.
+
+    Parquet, json and avro files keep nested dtypes, csv files cannot have them.
+
+    Examples
+    --------
+
+        >>> class Event(Model):
+        ...     payload = StructColumn({'action': StringColumn(), 'labels': ListColumn(StringColumn())})
+    """
+    default_dtype = polars.Struct
+
+    def __init__(self, fields: Dict[str, Union[Column, polars.DataType]], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields = dict(fields)
+        self.default_dtype = polars.Struct(
+            [polars.Field(name, _get_dtype(field)) for name, field in self.fields.items()]
+        )
+        self.supported_dtypes = [self.default_dtype]
+        self._cast_map = {polars.Utf8: lambda col: col.str.json_decode(self.default_dtype)}
+
+    def get_cast_map(self, cast_map):
+        return self._cast_map
+
+
+class ListColumn(Column):
+    """
+    Lists whose values are of the dtype of `inner`, a column (or a polars dtype), see
+    `StructColumn`.
+
+    Examples
+    --------
+
+        >>> class Event(Model):
+        ...     labels = ListColumn(StringColumn())
+    """
+    default_dtype = polars.List
+
+    def __init__(self, inner: Union[Column, polars.DataType], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.inner = inner
+        self.default_dtype = polars.List(_get_dtype(inner))
+        self.supported_dtypes = [self.default_dtype]
+        self._cast_map = {polars.Utf8: lambda col: col.str.json_decode(self.default_dtype)}
+
+    def get_cast_map(self, cast_map):
+        return self._cast_map
 
 
 class DateTimeColumn(Column):
+    """
+    Datetimes, strings are parsed with `format`, strings that do not match it raise.
+
+    The parse options are resolved once per column. ISO-8601 formats are parsed natively by
+    storages that can, like the csv reader, while reading, see `get_read_parser`.
+
+    Parameters
+    ----------
+    format : str
+        The strftime format of the strings, for example '%a %b %d %H:%M:%S %Y %z'.
+
+    utc : bool
+        Whether the datetimes are in UTC, datetimes with an offset (%z) are converted to it.
+
+    time_zone : str
+        The time zone of the datetimes, `utc=True` is the same as 'UTC'.
+
+    time_unit : str
+        'ns', 'us' or 'ms', if not given the one of the data is kept.
+    """
     supported_dtypes = [polars.Datetime, ]
     default_dtype = polars.Datetime
 
-    def __init__(self, format: str = '%Y-%m-%dT%H:%M:%SZ', utc: bool = False, *args, **kwargs):
+    ISO_FORMATS = frozenset([
+        '%Y-%m-%dT%H:%M:%SZ',
+        '%Y-%m-%dT%H:%M:%S%.fZ',
+        '%Y-%m-%dT%H:%M:%S',
+        '%Y-%m-%dT%H:%M:%S%.f',
+        '%Y-%m-%d %H:%M:%S',
+        '%Y-%m-%d %H:%M:%S%.f',
+    ])
+
+    def __init__(self, format: str = '%Y-%m-%dT%H:%M:%SZ', utc: bool = False, time_zone: Optional[str] = None,
+                 time_unit: Optional[str] = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.format = format
         self.utc = utc
+        self.time_zone = 'UTC' if utc else time_zone
+        self.time_unit = time_unit
 
-    def get_cast_map(self, cast_map):
-        return {
-            polars.Utf8: lambda col: col.str.to_datetime(format=self.format, utc=self.utc)
+        if self.time_zone or self.time_unit:
+            self.default_dtype = polars.Datetime(self.time_unit or 'us', self.time_zone)
+
+        self._cast_map = {
+            polars.Utf8: lambda col: col.str.to_datetime(
+                format=self.format, time_zone=self.time_zone, time_unit=self.time_unit, strict=True
+            )
         }
 
+    def get_cast_map(self, cast_map):
+        return self._cast_map
+
+    def get_read_parser(self) -> Optional[polars.Expr]:
+        if self.format in self.ISO_FORMATS:
+            return self._cast_map[polars.Utf8](polars.col(self.get_column_name()))
+        return None
+
 
 class DateColumn(Column):
+    """
+    Dates, strings are parsed with `format`, strings that do not match it raise. ISO-8601 dates
+    ('%Y-%m-%d') are parsed natively by storages that can, see `DateTimeColumn`.
+    """
     supported_dtypes = [polars.Date]
     default_dtype = polars.Date
 
@@ -275,7 +797,14 @@ class DateColumn(Column):
         super().__init__(*args, **kwargs)
         self.format = format
 
-    def get_cast_map(self, cast_map):
-        return {
-            polars.Utf8: lambda col: col.str.to_date(self.format)
+        self._cast_map = {
+            polars.Utf8: lambda col: col.str.to_date(self.format, strict=True)
         }
+
+    def get_cast_map(self, cast_map):
+        return self._cast_map
+
+    def get_read_parser(self) -> Optional[polars.Expr]:
+        if self.format == '%Y-%m-%d':
+            return self._cast_map[polars.Utf8](polars.col(self.get_column_name()))
+        return None
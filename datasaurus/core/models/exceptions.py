@@ -12,3 +12,29 @@ class FormatNeededError(Exception):
 
 class ColumnNotExistsError(Exception):
     """Raises when column does not exist in Model and its being provided"""
+
+
+class ModelDependencyCycleError(Exception):
+    """Raise when models depend on each other in a cycle"""
+
+
+class ModelSaveError(Exception):
+    """
+    Raise when a Model could not be saved to some of its targets, `errors` has the exception
+    of every (storage, format, table_name) target that failed.
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+class ValidationError(Exception):
+    """
+    Raise when rows of a Model do not pass the validators of its columns, `failures` has the
+    number of invalid rows by 'column:validator'.
+    """
+
+    def __init__(self, message, failures=None):
+        super().__init__(message)
+        self.failures = failures or {}
@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 from typing import Callable, List, Dict
 
 from datasaurus.core.loggers import datasaurus_logger
-from datasaurus.core.models import Model
+from datasaurus.core.models import Model, ModelBatch
 from datasaurus.core.models.columns import Column, Columns
 
 
@@ -124,6 +124,14 @@ class ModelFactory:
             ),
         )
 
+    @classmethod
+    def create_batch(cls, n_rows: int) -> ModelBatch:
+        """
+        Same as `create_rows` but the data is kept in a dataframe, rows are only built when they
+        are accessed, see `ModelBatch`.
+        """
+        return ModelBatch(cls.Meta.model, cls.create_df(n_rows).df)
+
     @classmethod
     def generate_one_row(cls, _=None) -> dict:
         return {k: v.evaluate() for k, v in cls.get_columns().items()}
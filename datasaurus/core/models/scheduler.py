@@ -0,0 +1,237 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from polars import DataFrame
+
+from datasaurus.core.loggers import datasaurus_logger
+from datasaurus.core.models.exceptions import ModelDependencyCycleError
+
+# The run the current thread is materializing models for, if any.
+current_run: contextvars.ContextVar[Optional['ModelScheduler']] = contextvars.ContextVar(
+    'current_run', default=None
+)
+
+# The models that are being materialized in the current thread, the last one is the one whose
+# calculate_data is running. Used to record dependencies and detect cycles.
+_node_stack: contextvars.ContextVar[Tuple] = contextvars.ContextVar('_node_stack', default=())
+
+
+class _Node:
+    __slots__ = ('model', 'df', 'error', 'claimed', 'done', 'lock')
+
+    def __init__(self, model):
+        self.model = model
+        self.df: Optional[DataFrame] = None
+        self.error: Optional[BaseException] = None
+        self.claimed = False
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    def claim(self) -> bool:
+        """Returns True if the caller is the one that has to materialize the node."""
+        with self.lock:
+            if self.claimed:
+                return False
+            self.claimed = True
+            return True
+
+
+class ModelScheduler:
+    """
+    Materializes a set of models and their upstream models, running independent branches
+    concurrently in a thread pool (polars releases the GIL) and computing every model exactly
+    once per run.
+
+    The dependency graph is built from `Meta.depends_on`, from the upstreams models recorded
+    the last time their calculate_data ran and from the `Model.df` accesses recorded while
+    running, so a model that reads an upstream which it does not declare still gets the
+    upstream computed once by the run: it either waits for it or computes it in its own
+    thread. Recorded dependencies are kept and used to order the following runs.
+
+    Parameters
+    ----------
+    models : Iterable[Model]
+        The models to materialize, models in their `Meta.depends_on` are added as well.
+
+    max_workers : int
+        Max number of models materialized at the same time, defaults to the
+        `ThreadPoolExecutor` default.
+
+    save : bool
+        Whether every model is saved to its storage once it is materialized.
+
+    Examples
+    --------
+
+        >>> scheduler = ModelScheduler([Repository, CommitMessage], save=True)
+        >>> results = scheduler.run()
+        >>> results[Repository]
+        shape: (10, 2)
+        ...
+    """
+
+    def __init__(self, models: Iterable, max_workers: Optional[int] = None, save: bool = False):
+        self.models = self._with_dependencies(models)
+        self.max_workers = max_workers
+        self.save = save
+
+        self.recorded_dependencies: Dict[object, Set] = {model: set() for model in self.models}
+        self._nodes: Dict[object, _Node] = {}
+
+    @staticmethod
+    def _get_dependencies(model) -> Set:
+        """
+        The models the model depends on: the declared ones, the upstreams recorded the last time
+        its calculate_data ran and the ones in the manifest saved with its data.
+        """
+        return set(model._meta.depends_on) | model._meta.upstreams | model._get_manifest_upstreams()
+
+    def _with_dependencies(self, models: Iterable) -> List:
+        """Returns the given models plus every model they transitively depend on."""
+        result = []
+        to_visit = list(models)
+
+        while to_visit:
+            model = to_visit.pop()
+            if model in result:
+                continue
+            result.append(model)
+            to_visit.extend(self._get_dependencies(model))
+
+        return result
+
+    @property
+    def graph(self) -> Dict[object, Set]:
+        """Model -> the models it depends on, both declared and recorded."""
+        return {
+            model: (self._get_dependencies(model) | self.recorded_dependencies.get(model, set())) & set(self.models)
+            for model in self.models
+        }
+
+    def _check_cycles(self, graph: Dict[object, Set]) -> None:
+        visiting, visited = set(), set()
+
+        def visit(model, path):
+            if model in visiting:
+                raise ModelDependencyCycleError(
+                    f'Models have a dependency cycle: {" -> ".join(str(m) for m in path + [model])}')
+            if model in visited:
+                return
+            visiting.add(model)
+            for dependency in graph[model]:
+                visit(dependency, path + [model])
+            visiting.discard(model)
+            visited.add(model)
+
+        for model in graph:
+            visit(model, [])
+
+    def materialize(self, model) -> Optional[DataFrame]:
+        """
+        Returns the dataframe of the model for this run, materializing it in the current
+        thread if nobody else is doing it yet. Returns None if the model itself is the one
+        being materialized.
+
+        Models that are not part of the run yet (upstreams no model declares and that were never
+        recorded) are added to it, so they are computed once as well.
+
+        Called from `Model.df` when it is accessed inside a run.
+        """
+        stack = _node_stack.get()
+        if stack and stack[-1] is not model:
+            self.recorded_dependencies.setdefault(stack[-1], set()).add(model)
+
+        # setdefault is atomic, threads that discover the same model get the same node.
+        node = self._nodes.setdefault(model, _Node(model))
+
+        if node.df is not None:
+            return node.df
+
+        if model in stack:
+            if stack[-1] is model:
+                # Model.df of the model being materialized, let it compute.
+                return None
+            raise ModelDependencyCycleError(
+                f'Models have a dependency cycle: {" -> ".join(str(m) for m in stack + (model,))}')
+
+        if node.claim():
+            self._execute(node)
+
+        node.done.wait()
+        if node.error is not None:
+            raise node.error
+
+        return node.df
+
+    def _execute(self, node: _Node) -> None:
+        token = _node_stack.set(_node_stack.get() + (node.model,))
+        datasaurus_logger.debug(f'[ModelScheduler] Materializing {node.model}')
+        try:
+            node.df = node.model._get_df()
+            if self.save:
+                node.model.save()
+        except BaseException as e:
+            node.error = e
+        finally:
+            _node_stack.reset(token)
+            node.done.set()
+
+    def _run_node(self, node: _Node) -> None:
+        if node.claim():
+            self._execute(node)
+
+        node.done.wait()
+        if node.error is not None:
+            raise node.error
+
+    def run(self) -> Dict[object, DataFrame]:
+        """
+        Materializes every model, returns a dict of model -> dataframe.
+
+        If a model fails no new models are started, the ones running are waited for and
+        the exception is raised.
+        """
+        graph = self.graph
+        self._check_cycles(graph)
+
+        self._nodes = {model: _Node(model) for model in self.models}
+        dependents: Dict[object, Set] = {model: set() for model in self.models}
+        for model, dependencies in graph.items():
+            for dependency in dependencies:
+                dependents[dependency].add(model)
+
+        remaining = {model: len(dependencies) for model, dependencies in graph.items()}
+        ready = [model for model, count in remaining.items() if not count]
+
+        token = current_run.set(self)
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {}
+                while ready or futures:
+                    for model in ready:
+                        # Every task needs its own copy of the context, a context can only be
+                        # entered by one thread at a time.
+                        context = contextvars.copy_context()
+                        futures[pool.submit(context.run, self._run_node, self._nodes[model])] = model
+                    ready = []
+
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        model = futures.pop(future)
+                        if future.exception() is not None:
+                            wait(futures)
+                            raise future.exception()
+
+                        for dependent in dependents[model]:
+                            remaining[dependent] -= 1
+                            if not remaining[dependent]:
+                                ready.append(dependent)
+        finally:
+            current_run.reset(token)
+
+        return {model: node.df for model, node in self._nodes.items()}
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}(models={len(self.models)}, max_workers={self.max_workers})'
@@ -0,0 +1,181 @@
+"""
+Column validators, every validator is a polars expression that is True for the valid rows, so
+the whole dataframe is validated at once without calling python per row.
+
+Examples
+--------
+
+    >>> class Repository(Model):
+    ...     name = StringColumn(validators=[NotNullValidator(), RegexValidator(r'^[\\w.-]+/[\\w.-]+$')])
+    ...     stars = IntegerColumn(validators=[RangeValidator(min_value=0)])
+    ...     license = StringColumn(validators=[AllowedValuesValidator(['MIT', 'GPL', 'APACHE'])])
+"""
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+import polars
+
+from datasaurus.core.models.exceptions import ValidationError
+
+
+class Validator:
+    """
+    Base validator, subclasses implement `get_expr`.
+
+    Null values are valid for every validator but `NotNullValidator`.
+    """
+    name = 'validator'
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        """Returns a boolean expression that is True for the rows where `col` is valid."""
+        raise NotImplementedError()
+
+    def get_valid_expr(self, col: polars.Expr) -> polars.Expr:
+        return self.get_expr(col).fill_null(True)
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}({", ".join(f"{k}={v!r}" for k, v in vars(self).items())})'
+
+
+class NotNullValidator(Validator):
+    name = 'not_null'
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        return col.is_not_null()
+
+    def get_valid_expr(self, col: polars.Expr) -> polars.Expr:
+        return self.get_expr(col)
+
+
+class RangeValidator(Validator):
+    """Values between `min_value` and `max_value`, both included and optional."""
+    name = 'range'
+
+    def __init__(self, min_value: Any = None, max_value: Any = None):
+        if min_value is None and max_value is None:
+            raise ValueError('RangeValidator needs min_value, max_value or both')
+
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        if self.min_value is None:
+            return col <= self.max_value
+
+        if self.max_value is None:
+            return col >= self.min_value
+
+        return col.is_between(self.min_value, self.max_value)
+
+
+class RegexValidator(Validator):
+    """String values that match `pattern`, anywhere in the value unless the pattern is anchored."""
+    name = 'regex'
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        return col.str.contains(self.pattern)
+
+
+class AllowedValuesValidator(Validator):
+    name = 'allowed_values'
+
+    def __init__(self, values: Collection):
+        self.values = list(values)
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        return col.is_in(self.values)
+
+
+class UniqueValidator(Validator):
+    """
+    Values that appear only once in the column, every repeated row is invalid.
+
+    With `Model.iter_batches` uniqueness is only checked inside every batch.
+    """
+    name = 'unique'
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        return col.is_unique()
+
+
+class ExpressionValidator(Validator):
+    """
+    Custom validator from a function that receives the column expression and returns the
+    boolean expression.
+
+    Examples
+    --------
+
+        >>> ExpressionValidator(lambda col: col % 2 == 0, name='even')
+    """
+
+    def __init__(self, func: Callable[[polars.Expr], polars.Expr], name: str = 'expression'):
+        self.func = func
+        self.name = name
+
+    def get_expr(self, col: polars.Expr) -> polars.Expr:
+        return self.func(col)
+
+
+class ValidationPlan:
+    """
+    The validators of all the columns of a model compiled into expressions, evaluated together.
+
+    Attributes
+    ----------
+    checks : List[Tuple[str, polars.Expr]]
+        The label ('column:validator') and the expression of every validator.
+    """
+    __slots__ = ('checks',)
+
+    FAILED_VALIDATORS_COLUMN = 'failed_validators'
+
+    def __init__(self, checks: List[Tuple[str, polars.Expr]]):
+        self.checks = checks
+
+    def __bool__(self):
+        return bool(self.checks)
+
+    def select(self, columns: List[str]) -> 'ValidationPlan':
+        """Returns the plan of the validators whose columns are all in `columns`."""
+        return ValidationPlan([
+            (label, expr) for label, expr in self.checks if set(expr.meta.root_names()) <= set(columns)
+        ])
+
+    def count_failures(self, df: polars.DataFrame) -> Dict[str, int]:
+        """Returns the number of invalid rows by validator, all validators in a single select."""
+        counts = df.select([(~expr).sum().alias(label) for label, expr in self.checks]).row(0, named=True)
+        return {label: count for label, count in counts.items() if count}
+
+    def split(self, df: polars.DataFrame) -> Tuple[polars.DataFrame, Optional[polars.DataFrame]]:
+        """
+        Returns the valid rows and the invalid ones with the list of the validators they failed,
+        the invalid ones are None if all rows are valid.
+        """
+        if not self.count_failures(df):
+            return df, None
+
+        valid = polars.all_horizontal([expr for _, expr in self.checks])
+        failed_validators = polars.concat_list([
+            polars.when(expr).then(None).otherwise(polars.lit(label)) for label, expr in self.checks
+        ]).list.drop_nulls().alias(self.FAILED_VALIDATORS_COLUMN)
+
+        # Evaluated on the whole dataframe, validators like UniqueValidator depend on every row.
+        df = df.with_columns(valid.alias('__valid'), failed_validators)
+        return (
+            df.filter(polars.col('__valid')).drop('__valid', self.FAILED_VALIDATORS_COLUMN),
+            df.filter(~polars.col('__valid')).drop('__valid')
+        )
+
+    def validate(self, df: polars.DataFrame) -> polars.DataFrame:
+        """Returns the dataframe if every row is valid, raises `ValidationError` otherwise."""
+        failures = self.count_failures(df)
+        if failures:
+            raise ValidationError(
+                f'{sum(failures.values())} validation errors: '
+                + ', '.join(f'{label} failed for {count} rows' for label, count in failures.items()),
+                failures=failures,
+            )
+        return df
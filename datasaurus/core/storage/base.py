@@ -1,11 +1,13 @@
 import os
 from abc import abstractmethod, ABC
-from typing import Union, Optional
+from typing import Any, Callable, Hashable, Iterator, List, Union, Optional
 
 import polars
 
 from datasaurus.core import classproperty
+from datasaurus.core.loggers import datasaurus_logger
 from datasaurus.core.storage.format import DataFormat, FormatNotSet
+from datasaurus.core.storage.query import Lookup
 
 
 class _auto_resolve:
@@ -41,6 +43,32 @@ class Storage(ABC):
     def read_file(self, file_name: str, columns: list, format: DataFormat) -> polars.DataFrame:
         ...
 
+    def scan_file(self, file_name: str, columns: list, format: DataFormat,
+                  lookups: Optional[List[Lookup]] = None) -> polars.LazyFrame:
+        """
+        Returns a LazyFrame of the file, storages that cannot scan lazily fall back to reading
+        the whole file.
+
+        `lookups` are a hint, storages that can filter by them while reading (like SQL ones) do,
+        the LazyFrame is expected to be filtered by them afterwards anyway.
+        """
+        if lookups:
+            return self.read_file(file_name, columns, format=format, lookups=lookups).lazy()
+        return self.read_file(file_name, columns, format=format).lazy()
+
+    def read_max(self, file_name: str, column: str, format: DataFormat,
+                 cast: Optional[Callable[[polars.DataType], polars.Expr]] = None, **kwargs) -> Any:
+        """
+        Returns the max value of the column, None if the file has no rows. Only the column is
+        read, storages that can compute the max themselves (like SQL ones) do.
+
+        `cast` returns the expression that casts the column from the dtype it is stored with, the
+        max is taken after it so strings are compared as the values they are parsed to.
+        """
+        lf = self.scan_file(file_name, [column], format=format, **kwargs)
+        col = cast(lf.schema[column]) if cast else polars.col(column)
+        return lf.select(col.max()).collect().item()
+
     @abstractmethod
     def file_exists(self, file_name, format: Optional[DataFormat]) -> bool:
         pass
@@ -49,6 +77,48 @@ class Storage(ABC):
     def write_file(self, data, file_name, format: Optional[DataFormat], **kwargs) -> None:
         pass
 
+    def iter_batches(self, file_name: str, columns: list, format: DataFormat,
+                     batch_size: int) -> Iterator[polars.DataFrame]:
+        """
+        Yields the file in dataframes of at most `batch_size` rows, storages that cannot read
+        in batches read the whole file and slice it.
+        """
+        yield from self.read_file(file_name, columns, format=format).iter_slices(batch_size)
+
+    def sink_file(self, lf: polars.LazyFrame, file_name: str, format: Optional[DataFormat], **kwargs) -> None:
+        """
+        Writes a LazyFrame, storages that cannot stream it to the file collect it with the
+        streaming engine and write it.
+        """
+        self.write_file(lf.collect(streaming=True), file_name, format=format, **kwargs)
+
+    def append_file(self, data, file_name, format: Optional[DataFormat], **kwargs) -> None:
+        """
+        Appends the data to the file instead of rewriting it, used by incremental models.
+        """
+        raise NotImplementedError(f'{type(self)} does not support appending data')
+
+    def get_version(self, file_name: str, format: Optional[DataFormat]) -> Optional[Hashable]:
+        """
+        Returns a cheap to compute value that changes every time the file changes, None if the
+        storage cannot tell or the file does not exist.
+        """
+        return None
+
+    def read_manifest(self, file_name: str, format: Optional[DataFormat]) -> Optional[dict]:
+        """
+        Returns the manifest stored next to the file, None if there is none or the storage
+        does not support manifests.
+        """
+        return None
+
+    def write_manifest(self, file_name: str, format: Optional[DataFormat], manifest: dict) -> None:
+        """
+        Stores a small json-serializable dict next to the file, storages that do not support
+        manifests ignore it.
+        """
+        datasaurus_logger.debug(f'{self} does not support manifests, ignoring manifest of {file_name}')
+
     def supports_format(self, format: DataFormat):
         return format in self.supported_formats
 
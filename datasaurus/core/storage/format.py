@@ -1,4 +1,5 @@
 from enum import Enum, auto, EnumMeta
+from typing import Tuple, Union
 
 
 class DataFormat:
@@ -27,12 +28,64 @@ class LowerIndexedEnum(Enum, metaclass=LowerIndexedMeta):
     pass
 
 
-class FileFormat(DataFormat, LowerIndexedEnum):
+class Compression(LowerIndexedEnum):
+    """Compressions text files can have, the values are their file suffixes."""
+    GZIP = 'gz'
+    BZ2 = 'bz2'
+    LZ4 = 'lz4'
+    ZSTD = 'zst'
+
+    @property
+    def codec(self) -> str:
+        """The name of the compression in pyarrow."""
+        return self.name.lower()
+
+    @property
+    def suffix(self) -> str:
+        return f'.{self.value}'
+
+    @classmethod
+    def get(cls, compression: Union['Compression', str]) -> 'Compression':
+        """Returns the compression by its name ('gzip') or its suffix ('gz')."""
+        if isinstance(compression, cls):
+            return compression
+
+        try:
+            return cls[compression]
+        except KeyError:
+            return cls(compression.lower())
+
+
+# File suffixes of the compressions, without the dot.
+COMPRESSION_SUFFIXES = frozenset(compression.value for compression in Compression)
+
+
+class FileFormatMeta(LowerIndexedMeta):
+    def __getitem__(cls, name):
+        # Formats of compressed files are indexed by their suffix, like 'csv.gz'.
+        name, _, compression = name.partition('.')
+
+        if compression:
+            return super().__getitem__(name).with_compression(compression)
+
+        return super().__getitem__(name)
+
+    def __contains__(cls, item):
+        if isinstance(item, CompressedFormat):
+            return True
+
+        return super().__contains__(item)
+
+
+class FileFormat(DataFormat, LowerIndexedEnum, metaclass=FileFormatMeta):
     JSON = auto()
     CSV = auto()
     PARQUET = auto()
     EXCEL = auto()
     AVRO = auto()
+    IPC = auto()
+    FEATHER = IPC
+    NDJSON = auto()
 
     @property
     def name(self) -> str:
@@ -41,3 +94,66 @@ class FileFormat(DataFormat, LowerIndexedEnum):
     @property
     def suffix(self) -> str:
         return f'.{super().name.lower()}'
+
+    @property
+    def suffixes(self) -> Tuple[str, ...]:
+        """The suffixes of the files of this format, new files are given the first one."""
+        return (self.suffix, *SUFFIX_ALIASES.get(self, ()))
+
+    def with_compression(self, compression: Union[Compression, str]) -> 'CompressedFormat':
+        """
+        Returns the format of the compressed files of this format.
+
+        Examples
+        --------
+            >>> FileFormat.NDJSON.with_compression('gzip').suffix
+            '.ndjson.gz'
+        """
+        return CompressedFormat(self, Compression.get(compression))
+
+
+# Other suffixes of the files of a format, a file named with one of them keeps it.
+SUFFIX_ALIASES = {FileFormat.IPC: ('.feather', '.arrow')}
+
+# Text formats, the ones whose files can be compressed as a whole.
+TEXT_FORMATS = (FileFormat.JSON, FileFormat.CSV, FileFormat.NDJSON)
+
+
+class CompressedFormat(DataFormat):
+    """
+    A text `FileFormat` whose files are compressed, like 'events.ndjson.gz'. Files are
+    decompressed while they are read and compressed while they are written.
+    """
+
+    def __init__(self, format: FileFormat, compression: Compression):
+        if format not in TEXT_FORMATS:
+            raise ValueError(f"Format '{format}' cannot be compressed, only {TEXT_FORMATS} can")
+
+        self.format = format
+        self.compression = compression
+
+    @property
+    def name(self) -> str:
+        return f'{self.format.name}.{self.compression.value}'
+
+    @property
+    def suffix(self) -> str:
+        return f'{self.format.suffix}{self.compression.suffix}'
+
+    @property
+    def suffixes(self) -> Tuple[str, ...]:
+        return (self.suffix,)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompressedFormat):
+            return NotImplemented
+        return (self.format, self.compression) == (other.format, other.compression)
+
+    def __hash__(self):
+        return hash((self.format, self.compression))
+
+    def __str__(self):
+        return f'{self.format}{self.compression.suffix}'
+
+    def __repr__(self):
+        return f'<CompressedFormat.{self.name}>'
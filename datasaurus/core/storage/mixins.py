@@ -1,11 +1,19 @@
+import functools
+import json
+import operator
 import pathlib
+import shutil
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
 
 import polars as pl
 
 from datasaurus.core.loggers import datasaurus_logger
-from datasaurus.core.storage.format import FileFormat
+from datasaurus.core.storage.format import CompressedFormat, FileFormat
+from datasaurus.core.storage.query import Lookup, lookups_to_sql
 
 
 class StorageOperationMixinBase(ABC):
@@ -31,13 +39,61 @@ def list_to_sql_columns(input_list: List[str]) -> str:
 class SQLStorageOperationsMixin(StorageOperationMixinBase):
     EXISTS_QUERY = 'SELECT * FROM `{table_name}` LIMIT 1'
 
-    def read_file(self, file_name: str, columns: list, format=None):
+    # Query that returns one row that changes whenever the table changes, None if the database
+    # has no cheap way of telling.
+    VERSION_QUERY = None
+
+    def read_file(self, file_name: str, columns: list, format=None, lookups: Optional[List[Lookup]] = None):
+        """
+        Reads the columns of the table, if lookups are given they are added to the query as a
+        parameterized WHERE clause, so only the matching rows leave the database.
+        """
         datasaurus_logger.debug(f'Trying to read {file_name}')
         query = f'SELECT {list_to_sql_columns(columns)} FROM "{file_name}"'
-        datasaurus_logger.debug(f'query: {query}')
         datasaurus_logger.debug(f'uri: {self.get_uri()}')
+
+        if lookups:
+            import sqlalchemy
+
+            where, params = lookups_to_sql(lookups)
+            query += where
+            datasaurus_logger.debug(f'query: {query}, parameters: {params}')
+
+            engine = sqlalchemy.create_engine(self.get_uri())
+            try:
+                with engine.connect() as connection:
+                    return pl.read_database(sqlalchemy.text(query), connection,
+                                            execute_options={'parameters': params})
+            finally:
+                engine.dispose()
+
+        datasaurus_logger.debug(f'query: {query}')
         return pl.read_database(query, self.get_uri())
 
+    def read_max(self, file_name: str, column: str, format=None, cast=None, **kwargs):
+        """Returns the max value of the column, computed by the database, see `Storage.read_max`."""
+        import sqlalchemy
+
+        query = f'SELECT MAX({column}) AS {column} FROM "{file_name}"'
+        datasaurus_logger.debug(f'query: {query}')
+
+        engine = sqlalchemy.create_engine(self.get_uri())
+        try:
+            with engine.connect() as connection:
+                df = pl.read_database(sqlalchemy.text(query), connection)
+        finally:
+            engine.dispose()
+
+        return df.select(cast(df.schema[column]) if cast else pl.col(column)).item()
+
+    def append_file(self, df: pl.DataFrame, file_name: str, format: FileFormat = None, **kwargs):
+        datasaurus_logger.debug(f'Appending {df.height} rows to {file_name}')
+        df.write_database(
+            table_name=file_name,
+            connection=self.get_uri(),
+            if_exists='append',
+        )
+
     def write_file(self, df: pl.DataFrame, file_name: str, format: FileFormat, **kwargs):
         if_exists = 'append' if self.file_exists(file_name) else 'replace'
         datasaurus_logger.debug(f'Attempting to write: {df}')
@@ -63,29 +119,582 @@ class SQLStorageOperationsMixin(StorageOperationMixinBase):
             return False
         return True
 
+    def get_version(self, file_name, format: FileFormat = None) -> Optional[list]:
+        if self.VERSION_QUERY is None:
+            return None
+
+        query = self.VERSION_QUERY.format(table_name=file_name)
+        datasaurus_logger.debug(f'Getting version of "{file_name}", running query "{query}"')
+        rows = pl.read_database(query, self.get_uri()).rows()
+        return [str(value) for value in rows[0]] if rows else None
+
 
 class LocalStorageOperationsMixin(StorageOperationMixinBase):
     supported_formats = FileFormat
     needs_format = True
 
+    # Directory name of the partitions of null values, same as hive.
+    NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+    # Bytes of compressed files decompressed to infer their dtypes, see `get_compressed_schema`.
+    SCHEMA_INFERENCE_BYTES = 1 << 20
+
+    # Rows of a csv file checked against the parsers of its columns, see `read_csv_parsing`.
+    PARSE_SAMPLE_ROWS = 100
+
+    def get_full_path(self, file_name: str, format: FileFormat) -> pathlib.Path:
+        full_path = pathlib.Path(self.path) / file_name
+
+        if full_path.name.endswith(format.suffixes):
+            # Suffixes of compressed formats have several dots ('.csv.gz'), the ones of the
+            # format's aliases are kept ('data.feather').
+            return full_path
+
+        return full_path.with_suffix(format.suffix)
+
     def file_exists(self, file_name, format: FileFormat) -> bool:
-        return (pathlib.Path(self.path) / file_name).with_suffix(suffix=format.suffix).exists()
+        return self.get_full_path(file_name, format).exists()
 
-    def write_file(self, df: pl.DataFrame, file_name: str, format: FileFormat, **kwargs):
-        full_path = (pathlib.Path(self.path) / file_name).with_suffix(suffix=format.suffix)
+    def get_source(self, file_name: str, format: FileFormat) -> str:
+        """
+        Returns what has to be given to polars to read the file, for datasets (directories of
+        files, see `append_file`) it's a glob of all the files in it.
+        """
+        full_path = self.get_full_path(file_name, format)
+
+        if full_path.is_dir():
+            return str(full_path / '**' / f'*{format.suffix}')
+
+        return str(full_path)
+
+    def get_version(self, file_name, format: FileFormat) -> Optional[Tuple[int, int]]:
+        """Returns the (mtime in ns, size) of the file, the latest mtime and total size for datasets."""
+        full_path = self.get_full_path(file_name, format)
+
+        if not full_path.exists():
+            return None
+
+        if full_path.is_dir():
+            stats = [path.stat() for path in full_path.rglob(f'*{format.suffix}')]
+            return max((stat.st_mtime_ns for stat in stats), default=0), sum(stat.st_size for stat in stats)
+
+        stat = full_path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_manifest_path(self, file_name: str, format: FileFormat) -> pathlib.Path:
+        full_path = self.get_full_path(file_name, format)
+        return full_path.with_name(f'{full_path.name}.manifest.json')
+
+    def read_manifest(self, file_name: str, format: FileFormat) -> Optional[dict]:
+        manifest_path = self.get_manifest_path(file_name, format)
+
+        if not manifest_path.exists():
+            return None
+
+        return json.loads(manifest_path.read_text())
+
+    def write_manifest(self, file_name: str, format: FileFormat, manifest: dict) -> None:
+        manifest_path = self.get_manifest_path(file_name, format)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest))
+
+    def write_file(self, df: pl.DataFrame, file_name: str, format: FileFormat,
+                   partition_by: Optional[List[str]] = None, **kwargs):
+        """
+        Writes the dataframe to the file, with `partition_by` it's written as a partitioned
+        dataset, see `write_partitions`.
+        """
+        full_path = self.get_full_path(file_name, format)
+
+        if full_path.is_dir():
+            # The file was appended to before, writing replaces the whole dataset.
+            shutil.rmtree(full_path)
+
+        if partition_by:
+            full_path.unlink(missing_ok=True)
+            return self.write_partitions(df, file_name, format, partition_by, **kwargs)
 
         if not full_path.exists():
             full_path.parent.mkdir(parents=True, exist_ok=True)
 
+        if isinstance(format, CompressedFormat):
+            import pyarrow
+
+            with pyarrow.output_stream(full_path, compression=format.compression.codec) as stream:
+                return getattr(df, f'write_{format.format.name}')(stream, **kwargs)
+
         _write_func = getattr(df, f'write_{format.name}')
+
+        if format == FileFormat.IPC:
+            # IPC files are memory mapped by the reads, writing over them would change the data of
+            # the dataframes already read, the new file replaces it instead.
+            tmp_path = full_path.with_name(f'{full_path.name}.tmp')
+            _write_func(tmp_path, **kwargs)
+            return tmp_path.replace(full_path)
+
         return _write_func(full_path, **kwargs)
 
-    def read_file(self, file_name, columns, format: FileFormat = None, **kwargs):
-        full_path = (pathlib.Path(self.path) / file_name).with_suffix(format.suffix)
+    def get_part_path(self, path: pathlib.Path, format: FileFormat) -> pathlib.Path:
+        """Returns the path of a new file in the dataset directory `path`."""
+        return path / f'part-{time.time_ns()}-{uuid.uuid4().hex[:8]}{format.suffix}'
+
+    def get_partition_path(self, file_name: str, format: FileFormat, partition_by: List[str],
+                           values: tuple) -> pathlib.Path:
+        """Returns the directory of the partition, 'column=value' for every partition column."""
+        return self.get_full_path(file_name, format).joinpath(*(
+            f'{column}={self.NULL_PARTITION if value is None else quote(str(value), safe="")}'
+            for column, value in zip(partition_by, values)
+        ))
+
+    def write_partitions(self, df: pl.DataFrame, file_name: str, format: FileFormat, partition_by: List[str],
+                         **kwargs) -> None:
+        """
+        Writes a file for every partition of the dataframe to its hive style directory, like
+        'commits.parquet/repo=polars/date=2023-01-01/part-....parquet', into the dataset.
+
+        The files keep the partition columns, so their dtypes and nulls do not depend on parsing
+        the directory names.
+        """
+        if format != FileFormat.PARQUET:
+            raise ValueError(f"Format '{format}' cannot be partitioned, use parquet")
+
+        for values, partition in df.partition_by(partition_by, as_dict=True).items():
+            # Polars does not use tuples as keys when partitioning by one column.
+            values = values if isinstance(values, tuple) else (values,)
+            partition_path = self.get_partition_path(file_name, format, partition_by, values)
+            partition_path.mkdir(parents=True, exist_ok=True)
+            partition.write_parquet(self.get_part_path(partition_path, format), **kwargs)
+
+    def prune_partitions(self, file_name: str, format: FileFormat, partition_by: List[str],
+                         predicates: List[pl.Expr]) -> Optional[List[str]]:
+        """
+        Returns the files of the partitions that can have rows that match the predicates, the
+        predicates that only use partition columns are evaluated on the values of the directory
+        names, None if there are none or they cannot be evaluated on them.
+
+        The values are parsed to the dtypes the files keep the columns with, the partitions whose
+        values cannot be parsed are kept.
+        """
+        predicates = [predicate for predicate in predicates if set(predicate.meta.root_names()) <= set(partition_by)]
+
+        if not predicates:
+            return None
+
+        full_path = self.get_full_path(file_name, format)
+
+        # Files out of the partitions, like the ones saved before the model was partitioned, are kept.
+        files, kept_files, rows = [], [], []
+        for path in self.get_files(file_name, format):
+            values = dict(part.split('=', 1) for part in path.relative_to(full_path).parts[:-1] if '=' in part)
+
+            if not values.keys() >= set(partition_by):
+                kept_files.append(str(path))
+                continue
+
+            files.append(path)
+            rows.append([None if values[column] == self.NULL_PARTITION else unquote(values[column])
+                         for column in partition_by])
+
+        if not files:
+            return kept_files
+
+        schema = pl.read_parquet_schema(files[0])
+        values = pl.DataFrame(rows, schema={column: pl.Utf8 for column in partition_by}, orient='row')
+
+        try:
+            partitions = values.select([
+                self.parse_partition_values(pl.col(column), schema.get(column, pl.Utf8)) for column in partition_by
+            ])
+            matches = partitions.select(pl.all_horizontal(predicates).fill_null(False)).to_series()
+        except (pl.ComputeError, pl.InvalidOperationError, pl.SchemaError, pl.ColumnNotFoundError) as e:
+            datasaurus_logger.debug(f'Partitions of {full_path} cannot be pruned by {predicates}: {e}')
+            return None
+
+        unparsed = functools.reduce(operator.or_, (
+            values[column].is_not_null() & partitions[column].is_null() for column in partition_by
+        ))
+        return kept_files + [str(path) for path, is_kept in zip(files, matches | unparsed) if is_kept]
+
+    @staticmethod
+    def parse_partition_values(col: pl.Expr, dtype: pl.DataType) -> pl.Expr:
+        """Parses the values of the directory names, the ones that cannot be parsed are null."""
+        if dtype == pl.Datetime:
+            return col.str.to_datetime(time_unit=dtype.time_unit, time_zone=dtype.time_zone, strict=False)
+
+        if dtype == pl.Date:
+            return col.str.to_date(strict=False)
+
+        return col.cast(dtype, strict=False)
+
+    def get_files(self, file_name: str, format: FileFormat) -> List[pathlib.Path]:
+        """Returns the files of the file, more than one for datasets."""
+        full_path = self.get_full_path(file_name, format)
+
+        if full_path.is_dir():
+            return sorted(full_path.rglob(f'*{format.suffix}'))
+
+        return [full_path]
+
+    def iter_batches(self, file_name, columns, format: FileFormat = None,
+                     batch_size: int = 50_000) -> Iterator[pl.DataFrame]:
+        """
+        Yields the file in dataframes of at most `batch_size` rows without reading it whole:
+
+        - Parquet: Record batches of the row groups, only the given columns are decoded.
+        - CSV: Polars' batched csv reader, only the given columns are decoded.
+        - IPC: Record batches of the memory mapped file, only the given columns are decompressed.
+        - Compressed csv and ndjson: Record batches of the file while it is decompressed.
+        - Other formats are read whole and sliced.
+        """
+        full_path = self.get_full_path(file_name, format)
 
         if not full_path.exists():
             raise ValueError(f"Trying to read from '{full_path}' but file does not exist")
 
+        if format == FileFormat.PARQUET:
+            import pyarrow.parquet as pq
+
+            for path in self.get_files(file_name, format):
+                parquet_file = pq.ParquetFile(path)
+                file_columns = [column for column in columns if column in parquet_file.schema_arrow.names]
+
+                for batch in parquet_file.iter_batches(batch_size=batch_size, columns=file_columns or None):
+                    yield pl.from_arrow(batch)
+
+        elif format == FileFormat.IPC:
+            import pyarrow
+
+            for path in self.get_files(file_name, format):
+                with pyarrow.memory_map(str(path)) as source:
+                    reader = pyarrow.ipc.open_file(source)
+                    file_columns = [column for column in columns if column in reader.schema.names]
+
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i)
+                        batch = batch.select(file_columns) if file_columns else batch
+                        yield from pl.from_arrow(batch).iter_slices(batch_size)
+
+        elif format == FileFormat.CSV:
+            projection = self.get_projection(pl.scan_csv(full_path).columns, columns) if columns else None
+            reader = pl.read_csv_batched(full_path, columns=projection, batch_size=batch_size)
+
+            while batches := reader.next_batches(1):
+                # The reader's batch_size is only a hint, batches can be bigger.
+                batch = batches[0].select(projection) if projection is not None else batches[0]
+                yield from batch.iter_slices(batch_size)
+
+        elif isinstance(format, CompressedFormat) and format.format != FileFormat.JSON:
+            for batch in self.open_compressed_file(full_path, format, columns):
+                yield from pl.from_arrow(batch).iter_slices(batch_size)
+
+        else:
+            yield from self.read_file(file_name, columns, format=format).iter_slices(batch_size)
+
+    def get_compressed_schema(self, full_path: pathlib.Path, format: CompressedFormat) -> Dict[str, pl.DataType]:
+        """
+        Infers the dtypes of a compressed csv or ndjson file with polars from its first rows, so
+        they are the same ones the uncompressed file would be read with.
+        """
+        import pyarrow
+
+        with pyarrow.input_stream(full_path, compression=format.compression.codec) as stream:
+            head = stream.read(self.SCHEMA_INFERENCE_BYTES)
+
+        if len(head) == self.SCHEMA_INFERENCE_BYTES:
+            # The last line is probably cut.
+            head = head[:head.rfind(b'\n') + 1] or head
+
+        # Polars infers the dtypes from the first 100 rows.
+        if format.format == FileFormat.CSV:
+            return pl.read_csv(head, n_rows=100).schema
+
+        return pl.read_ndjson(b'\n'.join(head.split(b'\n', 100)[:100])).schema
+
+    @classmethod
+    def get_regular_arrow_type(cls, arrow_type):
+        """
+        Returns the arrow type with its large strings and lists (the ones polars uses) replaced
+        by regular ones, the pyarrow parsers do not support large types.
+        """
+        import pyarrow
+
+        if pyarrow.types.is_large_string(arrow_type):
+            return pyarrow.string()
+
+        if pyarrow.types.is_large_binary(arrow_type):
+            return pyarrow.binary()
+
+        if pyarrow.types.is_large_list(arrow_type) or pyarrow.types.is_list(arrow_type):
+            return pyarrow.list_(cls.get_regular_arrow_type(arrow_type.value_type))
+
+        if pyarrow.types.is_struct(arrow_type):
+            return pyarrow.struct([field.with_type(cls.get_regular_arrow_type(field.type)) for field in arrow_type])
+
+        return arrow_type
+
+    def open_compressed_file(self, full_path: pathlib.Path, format: CompressedFormat,
+                             columns: Optional[List[str]]):
+        """
+        Returns a pyarrow reader of the record batches of a compressed csv or ndjson file, the file
+        is decompressed while it is read so it is never inflated whole in memory. Only the given
+        columns that are in the file are parsed, with the dtypes polars infers for them, see
+        `get_compressed_schema`.
+        """
+        import pyarrow
+        import pyarrow.csv
+        import pyarrow.json
+
+        schema = self.get_compressed_schema(full_path, format)
+        projection = self.get_projection(schema, columns) if columns else list(schema)
+        arrow_schema = pyarrow.schema([
+            field.with_type(self.get_regular_arrow_type(field.type))
+            for field in pl.DataFrame(schema={column: schema[column] for column in projection}).to_arrow().schema
+        ])
+        stream = pyarrow.input_stream(full_path, compression=format.compression.codec)
+
+        if format.format == FileFormat.CSV:
+            # Empty fields are nulls and quoted empty ones empty strings, like in polars.
+            return pyarrow.csv.open_csv(stream, convert_options=pyarrow.csv.ConvertOptions(
+                column_types=arrow_schema, include_columns=projection,
+                strings_can_be_null=True, quoted_strings_can_be_null=False
+            ))
+
+        return pyarrow.json.open_json(stream, parse_options=pyarrow.json.ParseOptions(
+            explicit_schema=arrow_schema, unexpected_field_behavior='ignore'
+        ))
+
+    def read_compressed_file(self, full_path: pathlib.Path, format: CompressedFormat,
+                             columns: Optional[List[str]]) -> pl.DataFrame:
+        """
+        Reads a compressed file, csv and ndjson ones are decompressed in batches, see
+        `open_compressed_file`, json ones are a single document and are decompressed whole.
+        """
+        if format.format == FileFormat.JSON:
+            import pyarrow
+
+            with pyarrow.input_stream(full_path, compression=format.compression.codec) as stream:
+                return pl.read_json(stream.read())
+
+        return pl.from_arrow(self.open_compressed_file(full_path, format, columns).read_all())
+
+    def sink_file(self, lf: pl.LazyFrame, file_name: str, format: FileFormat, **kwargs):
+        """
+        Writes the LazyFrame with the polars streaming engine, the data is processed in batches
+        and never has to fit in memory.
+
+        The data is written to a temporal file that replaces the file at the end, so a LazyFrame
+        that scans the same file can be sunk into it. If the format has no sink, the write needs
+        the pyarrow writer (like per column parquet options) or is partitioned, or the query
+        cannot run in the streaming engine it falls back to collecting it.
+        """
+        full_path = self.get_full_path(file_name, format)
+        _sink_func = getattr(lf, f'sink_{format.name}', None)
+
+        if _sink_func is None or kwargs.get('use_pyarrow') or kwargs.get('partition_by'):
+            datasaurus_logger.debug(f"Format '{format}' with options {kwargs} cannot be streamed, collecting it")
+            return self.write_file(lf.collect(streaming=True), file_name, format=format, **kwargs)
+
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = full_path.with_name(f'{full_path.name}.tmp')
+
+        try:
+            _sink_func(tmp_path, **kwargs)
+        except pl.exceptions.InvalidOperationError as e:
+            datasaurus_logger.debug(f'Query cannot be streamed ({e}), collecting it')
+            tmp_path.unlink(missing_ok=True)
+            return self.write_file(lf.collect(streaming=True), file_name, format=format, **kwargs)
+
+        if full_path.is_dir():
+            shutil.rmtree(full_path)
+
+        tmp_path.replace(full_path)
+
+    def append_file(self, df: pl.DataFrame, file_name: str, format: FileFormat,
+                    partition_by: Optional[List[str]] = None, **kwargs):
+        """
+        Appends the dataframe to the file without rewriting it.
+
+        - Parquet: The file becomes a dataset, a directory with the same name where every append is
+          a new file (one per partition with `partition_by`), if a single file already exists it is
+          moved into the dataset as the first part.
+        - CSV: The rows are appended to the end of the file.
+        """
+        full_path = self.get_full_path(file_name, format)
+
+        if format == FileFormat.PARQUET:
+            if full_path.is_file():
+                tmp_path = full_path.with_name(f'{full_path.name}.tmp')
+                full_path.rename(tmp_path)
+                full_path.mkdir()
+                tmp_path.rename(full_path / f'part-0{format.suffix}')
+
+            if partition_by:
+                datasaurus_logger.debug(f'Appending {df.height} rows to the partitions of {full_path}')
+                return self.write_partitions(df, file_name, format, partition_by, **kwargs)
+
+            full_path.mkdir(parents=True, exist_ok=True)
+            part_path = self.get_part_path(full_path, format)
+
+            datasaurus_logger.debug(f'Appending {df.height} rows to {full_path} as {part_path.name}')
+            return df.write_parquet(part_path, **kwargs)
+
+        if format == FileFormat.CSV:
+            if not full_path.exists():
+                return self.write_file(df, file_name, format=format, **kwargs)
+
+            datasaurus_logger.debug(f'Appending {df.height} rows to {full_path}')
+            with open(full_path, 'ab') as file:
+                return df.write_csv(file, include_header=False, **kwargs)
+
+        if partition_by:
+            raise ValueError(f"Format '{format}' cannot be partitioned, use parquet")
+
+        raise ValueError(f"Format '{format}' does not support appending, use parquet or csv")
+
+    def get_read_options(self, format: FileFormat, partition_by: Optional[List[str]] = None,
+                         memory_map: bool = True) -> dict:
+        """
+        Returns the options of the polars reader of the format.
+
+        The files of partitioned datasets have the partition columns, the directory names are not
+        parsed as columns.
+
+        IPC files are memory mapped and not rechunked, the columns point to the pages of the file
+        and are shared with every other process that reads it. Compressed files cannot be mapped,
+        `memory_map` is False for them.
+        """
+        if partition_by and format == FileFormat.PARQUET:
+            return {'hive_partitioning': False}
+
+        if format == FileFormat.IPC:
+            return {'memory_map': memory_map, 'rechunk': not memory_map}
+
+        return {}
+
+    def read_file(self, file_name, columns, format: FileFormat = None, partition_by: Optional[List[str]] = None,
+                  memory_map: bool = True, parsers: Optional[Dict[str, pl.Expr]] = None, **kwargs):
+        """
+        Reads the given columns of the file, the ones that are not in the file are left out so
+        the model can report them. `partition_by` are the partition columns of a partitioned
+        dataset and `memory_map` whether IPC files are memory mapped, see `get_read_options`.
+        `parsers` are the columns the csv reader can parse natively, see `read_csv_parsing`.
+
+        Only the columns are decoded: formats polars can scan are scanned with the projection
+        pushed down, avro files are read with the columns, compressed files are decompressed
+        while they are read, see `read_compressed_file`, the rest are read whole.
+        """
+        full_path = self.get_full_path(file_name, format)
+
+        if not full_path.exists():
+            raise ValueError(f"Trying to read from '{full_path}' but file does not exist")
+
+        if isinstance(format, CompressedFormat):
+            df = self.read_compressed_file(full_path, format, columns)
+            return df.select(self.get_projection(df.columns, columns)) if columns else df
+
+        source = self.get_source(file_name, format)
+        options = self.get_read_options(format, partition_by, memory_map)
+        _scan_func = getattr(pl, f'scan_{format.name}', None)
+
+        if parsers and format == FileFormat.CSV:
+            return self.read_csv_parsing(source, columns, parsers)
+
+        if _scan_func is not None:
+            lf = _scan_func(source, **options)
+            return (lf.select(self.get_projection(lf.columns, columns)) if columns else lf).collect()
+
         _read_func = getattr(pl, f'read_{format.name}')
 
-        return _read_func(full_path)
+        if columns and format == FileFormat.AVRO:
+            # Polars 0.20 mislabels the columns of avro files if they are not in the order of the file.
+            file_columns = _read_func(source, n_rows=0).columns
+            options['columns'] = [column for column in file_columns if column in columns]
+
+        df = _read_func(source, **options)
+        return df.select(self.get_projection(df.columns, columns)) if columns else df
+
+    def read_csv_parsing(self, source: str, columns: Optional[List[str]], parsers: Dict[str, pl.Expr]) -> pl.DataFrame:
+        """
+        Reads a csv file parsing the ISO datetimes and dates of `parsers` natively in the reader,
+        without losing the strictness of the parsers:
+
+        - A column is only parsed by the reader if the parser accepts its first rows, the reader
+          fixes the pattern of a column with its first value.
+        - The reader turns the values that do not match the pattern into nulls, the columns that
+          end up with more nulls than strings are read again as strings, so the model parses them
+          and raises on the malformed ones.
+        """
+        lf = pl.scan_csv(source)
+        projection = self.get_projection(lf.columns, columns) if columns else lf.columns
+        parsers = {name: parser for name, parser in parsers.items() if name in projection}
+        strings = {name: pl.Utf8 for name in parsers}
+
+        dtypes = {}
+        sample = pl.scan_csv(source, dtypes=strings).select(list(parsers)).head(self.PARSE_SAMPLE_ROWS).collect()
+        for name, parser in parsers.items():
+            if sample[name].null_count() == sample.height:
+                continue
+
+            try:
+                dtypes[name] = sample.select(parser).to_series().dtype
+            except pl.ComputeError:
+                datasaurus_logger.debug(f"Column '{name}' of {source} does not match its format, parsing it later")
+
+        if not dtypes:
+            return lf.select(projection).collect()
+
+        try:
+            df = pl.scan_csv(source, dtypes=dtypes).select(projection).collect()
+        except pl.ComputeError:
+            return lf.select(projection).collect()
+
+        nullable = [name for name in dtypes if df[name].null_count()]
+        if nullable:
+            raw = pl.scan_csv(source, dtypes={name: pl.Utf8 for name in nullable}).select(nullable).collect()
+            df = df.with_columns([raw[name] for name in nullable if raw[name].null_count() != df[name].null_count()])
+
+        return df
+
+    @staticmethod
+    def get_projection(file_columns: List[str], columns: List[str]) -> List[str]:
+        """Returns the columns that are in the file, in the given order."""
+        file_columns = frozenset(file_columns)
+        return [column for column in columns if column in file_columns]
+
+    def scan_file(self, file_name, columns, format: FileFormat = None, lookups: Optional[List[Lookup]] = None,
+                  partition_by: Optional[List[str]] = None, memory_map: bool = True,
+                  predicates: Optional[List[pl.Expr]] = None, **kwargs) -> pl.LazyFrame:
+        """
+        Scans the file lazily, polars pushes the filters of the LazyFrame down to the scan
+        (skipping parquet row groups by their statistics). Lookups and `predicates` are only
+        used to skip the partitions of partitioned datasets that cannot match them, see
+        `prune_partitions`.
+        """
+        full_path = self.get_full_path(file_name, format)
+
+        if not full_path.exists():
+            raise ValueError(f"Trying to scan '{full_path}' but file does not exist")
+
+        _scan_func = getattr(pl, f'scan_{format.name}', None)
+
+        if _scan_func is None:
+            # Polars cannot scan every format (json, excel, avro..), those are read eagerly.
+            datasaurus_logger.debug(f"Format '{format}' cannot be scanned, reading '{full_path}'")
+            return self.read_file(file_name, columns, format=format, partition_by=partition_by,
+                                  **kwargs).lazy()
+
+        source = self.get_source(file_name, format)
+        options = self.get_read_options(format, partition_by, memory_map)
+
+        if partition_by and format == FileFormat.PARQUET:
+            predicates = [*(predicates or ()), *(lookup.to_polars() for lookup in lookups or ())]
+            files = self.prune_partitions(file_name, format, partition_by, predicates)
+
+            if files is not None:
+                datasaurus_logger.debug(f'Scanning {len(files)} partitions of {full_path} for {predicates}')
+
+                if not files:
+                    return pl.LazyFrame(schema=pl.read_parquet_schema(self.get_files(file_name, format)[0]))
+                source = files
+
+        return _scan_func(source, **options)
@@ -0,0 +1,96 @@
+import operator
+from typing import Any, Dict, List, Tuple
+
+import polars
+
+LOOKUP_SEPARATOR = '__'
+
+
+class Lookup:
+    """
+    A simple predicate over one column, like django's field lookups: 'stars__gte=10' is
+    the column 'stars', the operator 'gte' and the value 10.
+
+    Lookups can be pushed down to any storage, as a polars expression (`to_polars`) or
+    as a parameterized SQL condition (`to_sql`).
+
+    Examples
+    --------
+
+        >>> Lookup.from_kwarg('stars__gte', 10).to_polars()
+        [(col("stars")) >= (10)]
+        >>> Lookup.from_kwarg('repo', 'x').to_sql('p0')
+        ('repo = :p0', {'p0': 'x'})
+    """
+    OPERATORS = {
+        'eq': ('=', operator.eq),
+        'ne': ('!=', operator.ne),
+        'gt': ('>', operator.gt),
+        'gte': ('>=', operator.ge),
+        'lt': ('<', operator.lt),
+        'lte': ('<=', operator.le),
+        'in': ('IN', None),
+        'isnull': ('IS NULL', None),
+    }
+
+    def __init__(self, column: str, operator: str, value: Any):
+        if operator not in self.OPERATORS:
+            raise ValueError(f"Lookup '{operator}' is not supported, supported lookups are {list(self.OPERATORS)}")
+
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    @classmethod
+    def from_kwarg(cls, key: str, value: Any) -> 'Lookup':
+        column, _, operator = key.partition(LOOKUP_SEPARATOR)
+        return cls(column, operator or 'eq', value)
+
+    def to_polars(self) -> polars.Expr:
+        col = polars.col(self.column)
+
+        if self.operator == 'in':
+            return col.is_in(list(self.value))
+
+        if self.operator == 'isnull':
+            return col.is_null() if self.value else col.is_not_null()
+
+        return self.OPERATORS[self.operator][1](col, self.value)
+
+    def to_sql(self, param_name: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Returns the SQL condition and its parameters, the parameters are named after `param_name`.
+        """
+        sql_operator = self.OPERATORS[self.operator][0]
+
+        if self.operator == 'in':
+            if not self.value:
+                # 'IN ()' is invalid SQL, an empty 'in' matches no rows.
+                return '1 = 0', {}
+
+            params = {f'{param_name}_{i}': value for i, value in enumerate(self.value)}
+            placeholders = ', '.join(f':{name}' for name in params)
+            return f'{self.column} IN ({placeholders})', params
+
+        if self.operator == 'isnull':
+            return f'{self.column} {"IS NULL" if self.value else "IS NOT NULL"}', {}
+
+        return f'{self.column} {sql_operator} :{param_name}', {param_name: self.value}
+
+    def __repr__(self):
+        return f'{self.__class__.__qualname__}({self.column}{LOOKUP_SEPARATOR}{self.operator}={self.value!r})'
+
+
+def lookups_to_sql(lookups: List[Lookup]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Transforms the lookups into a 'WHERE ... AND ...' clause and its parameters, an empty string
+    if there are no lookups.
+    """
+    conditions, params = [], {}
+
+    for i, lookup in enumerate(lookups):
+        condition, lookup_params = lookup.to_sql(f'p{i}')
+        conditions.append(condition)
+        params.update(lookup_params)
+
+    return (f' WHERE {" AND ".join(conditions)}' if conditions else ''), params
@@ -57,6 +57,9 @@ class SqliteStorage(SQLStorageOperationsMixin, Storage):
 
 
 class MariadbStorage(SQLStorageOperationsMixin, Storage):
+    VERSION_QUERY = ("SELECT UPDATE_TIME, TABLE_ROWS FROM information_schema.tables"
+                     " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table_name}'")
+
     def __init__(self,
                  username: str,
                  password: str,
@@ -89,6 +92,9 @@ class MariadbStorage(SQLStorageOperationsMixin, Storage):
 
 
 class MysqlStorage(SQLStorageOperationsMixin, Storage):
+    VERSION_QUERY = ("SELECT UPDATE_TIME, TABLE_ROWS FROM information_schema.tables"
+                     " WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{table_name}'")
+
     def __init__(self,
                  username: str,
                  password: str,
@@ -122,6 +128,8 @@ class MysqlStorage(SQLStorageOperationsMixin, Storage):
 
 class PostgresStorage(SQLStorageOperationsMixin, Storage):
     EXISTS_QUERY = 'SELECT * FROM "{table_name}" LIMIT 1'
+    VERSION_QUERY = ("SELECT n_tup_ins, n_tup_upd, n_tup_del FROM pg_stat_user_tables"
+                     " WHERE relname = '{table_name}'")
 
     def __init__(self,
                  username: str,
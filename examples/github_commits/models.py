@@ -1,15 +1,15 @@
 from datasaurus.core.models import Model
-from datasaurus.core.models.columns import StringColumn, DateTimeColumn, IntegerColumn
+from datasaurus.core.models.columns import StringColumn, DateTimeColumn, IntegerColumn, CategoricalColumn
 from datasaurus.core.storage import FileFormat
 from examples.github_commits.settings import CommitsStorage
 
 
 class GithubCommit(Model):
     commit = StringColumn()
-    author = StringColumn()
+    author = CategoricalColumn()
     date = DateTimeColumn(format='%a %b %d %H:%M:%S %Y %z', utc=True)
     message = StringColumn()
-    repo = StringColumn()
+    repo = CategoricalColumn()
 
     class Meta:
         storage = CommitsStorage
@@ -1,6 +1,5 @@
 import json
-import pathlib
-import uuid
+import tempfile
 
 import polars
 import pytest
@@ -17,10 +16,7 @@ def create_tmp_dir():
     Creates a writable/readable random temporal directory in /tmp/.
 
     """
-    tmp_dir = str(uuid.uuid4())[:4]
-    file_path = f'/tmp/rand_{tmp_dir}'
-    pathlib.Path(file_path).mkdir()
-    return file_path
+    return tempfile.mkdtemp(prefix='rand_', dir='/tmp')
 
 
 @pytest.fixture
@@ -0,0 +1,122 @@
+import threading
+import time
+
+import polars
+from polars import testing
+
+from datasaurus import set_global_env
+from datasaurus.core.models.cache import ModelCache
+from datasaurus.core.storage.format import FileFormat
+
+
+def test_cache_evicts_least_recently_used():
+    df = polars.DataFrame({'a': [1, 2, 3]})
+    df_size = df.estimated_size()
+
+    cache = ModelCache(max_bytes=df_size * 2)
+
+    cache.get_or_load(('one',), lambda: df)
+    cache.get_or_load(('two',), lambda: df)
+
+    # 'one' is now the most recently used.
+    cache.get_or_load(('one',), lambda: df)
+    cache.get_or_load(('three',), lambda: df)
+
+    assert ('one',) in cache
+    assert ('two',) not in cache
+    assert ('three',) in cache
+    assert cache.size == df_size * 2
+
+    # Dataframes over the budget are never cached.
+    cache.get_or_load(('big',), lambda: polars.concat([df, df, df]))
+    assert ('big',) not in cache
+
+
+def test_cache_loads_once_across_threads():
+    cache = ModelCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return polars.DataFrame({'a': [1]})
+
+    threads = [threading.Thread(target=cache.get_or_load, args=(('key',), loader)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+
+
+def test_cache_shares_uncached_loads_across_threads():
+    """Waiting threads get the loaded dataframe even if it is too big to be cached"""
+    cache = ModelCache(max_bytes=1)
+    calls, results = [], []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return polars.DataFrame({'a': [1]})
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load(('key',), loader))) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8 and ('key',) not in cache
+
+
+def test_cache_invalidate():
+    cache = ModelCache()
+    cache.get_or_load(('model_a', 1), lambda: polars.DataFrame({'a': [1]}))
+    cache.get_or_load(('model_b', 1), lambda: polars.DataFrame({'a': [1]}))
+
+    cache.invalidate('model_a')
+    assert len(cache) == 1
+
+    cache.invalidate()
+    assert len(cache) == 0
+    assert cache.size == 0
+
+
+def test_model_df_is_memoized(model_class_without_local_data):
+    set_global_env('local')
+    calls = []
+
+    class FooModel(model_class_without_local_data):
+        def calculate_data(self):
+            calls.append(1)
+            return polars.DataFrame({'col1': ['a'], 'col2': [1]})
+
+    FooModel._meta.cache = ModelCache()
+    FooModel._meta.recalculate = 'always'
+
+    testing.assert_frame_equal(FooModel.df, FooModel.df)
+    assert len(calls) == 1
+
+    FooModel.invalidate()
+    FooModel.df
+    assert len(calls) == 2
+
+
+def test_model_df_cache_reloads_when_source_changes(model_class_with_local_data):
+    set_global_env('local')
+    model = model_class_with_local_data
+    model._meta.cache = ModelCache()
+    model._meta.format = FileFormat.CSV
+
+    path = model._meta.storage.from_env.get_uri()
+    polars.DataFrame({'col1': ['a'], 'col2': [1]}).write_csv(f'{path}/test_model.csv')
+
+    assert model.df.height == 1
+    assert len(model._meta.cache) == 1
+
+    polars.DataFrame({'col1': ['a', 'b'], 'col2': [1, 2]}).write_csv(f'{path}/test_model.csv')
+
+    assert model.df.height == 2
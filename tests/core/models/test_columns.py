@@ -1,10 +1,16 @@
 import datetime
+import sqlite3
 
 import polars
 import pytest
 
 from datasaurus.core.models import Model
-from datasaurus.core.models.columns import Column, Columns, StringColumn, IntegerColumn, DateColumn
+from datasaurus import set_global_env
+from datasaurus.core.models.columns import Column, Columns, StringColumn, IntegerColumn, DateColumn, DateTimeColumn, \
+    CategoricalColumn, EnumColumn, StructColumn, ListColumn
+from datasaurus.core.storage import StorageGroup
+from datasaurus.core.storage.storage import SqliteStorage
+from datasaurus.core.storage.format import FileFormat
 
 import polars as pl
 
@@ -198,3 +204,283 @@ def test_columns_order_doesnt_matter():
 
         }
     ).df
+
+
+def test_columns_plan():
+    """
+    The plan only casts the columns whose dtype differs, only selects if the columns differ
+    and is compiled once per schema.
+    """
+    col_1 = StringColumn()
+    col_2 = IntegerColumn()
+    col_1.__set_name__(None, 'col_1')
+    col_2.__set_name__(None, 'col_2')
+
+    columns = Columns([col_1, col_2])
+
+    plan = columns.get_plan({'col_1': polars.Utf8, 'col_2': polars.Int64})
+    assert plan.is_noop
+
+    plan = columns.get_plan({'col_2': polars.Int64, 'col_1': polars.Utf8})
+    assert not plan.casts
+    assert plan.select == ['col_1', 'col_2']
+
+    schema = {'col_1': polars.Utf8, 'col_2': polars.UInt8, 'col_3': polars.Int64}
+    plan = columns.get_plan(schema)
+    assert len(plan.casts) == 1
+    assert plan.select == ['col_1', 'col_2']
+    assert columns.get_plan(dict(schema)) is plan
+
+    df = polars.DataFrame({'col_1': ['a'], 'col_2': [1], 'col_3': [1]}, schema=schema)
+    assert plan.apply(df).schema == {'col_1': polars.Utf8, 'col_2': polars.Int64}
+
+    with pytest.raises(ValueError):
+        columns.get_plan({'col_1': polars.Utf8})
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.PARQUET, FileFormat.CSV])
+def test_categorical_columns(model_class_without_local_data, file_format):
+    """
+    Categorical and enum columns are cast from strings and keep their dtype through storage.
+    """
+    set_global_env('local')
+
+    class Commit(Model):
+        repo = CategoricalColumn()
+        license = EnumColumn(['MIT', 'GPL'])
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'commit'
+            format = file_format
+
+    # Defining the model does not change the process wide polars settings.
+    assert not polars.using_string_cache()
+
+    Commit.from_data({'repo': ['a', 'b', 'a'], 'license': ['MIT', 'GPL', 'MIT']}).save()
+
+    # Categoricals of different dataframes can be joined under the same string cache.
+    with polars.StringCache():
+        df = Commit.df
+        other = polars.DataFrame({'repo': ['b', 'a'], 'stars': [1, 2]}).with_columns(
+            polars.col('repo').cast(polars.Categorical)
+        )
+        assert df.join(other, on='repo')['stars'].to_list() == [2, 1, 2]
+
+    assert df.schema == {'repo': polars.Categorical, 'license': polars.Enum(['MIT', 'GPL'])}
+    assert df['repo'].to_list() == ['a', 'b', 'a']
+
+    with pytest.raises(polars.ComputeError):
+        Commit.from_data({'repo': ['a'], 'license': ['BSD']}).df
+
+
+def test_columns_shrink_dtypes():
+    small = IntegerColumn(dtype='auto')
+    unsigned = IntegerColumn(dtype='auto')
+    big = IntegerColumn()
+    small.__set_name__(None, 'small')
+    unsigned.__set_name__(None, 'unsigned')
+    big.__set_name__(None, 'big')
+
+    columns = Columns([small, unsigned, big])
+    df = polars.DataFrame({'small': [-100, 100], 'unsigned': [0, 200], 'big': [1, 2]})
+
+    plan = columns.get_plan(df.schema)
+    assert plan.shrink == [small, unsigned]
+    assert columns.shrink(df, plan.shrink).schema == {
+        'small': polars.Int8, 'unsigned': polars.UInt8, 'big': polars.Int64
+    }
+
+    # Columns that are already narrow are kept.
+    assert not columns.get_plan({'small': polars.Int16, 'unsigned': polars.UInt8, 'big': polars.Int64}).shrink
+
+    with pytest.raises(ValueError):
+        StringColumn(dtype='auto')
+
+
+def test_datetime_columns_parsed_while_reading(model_class_without_local_data):
+    """
+    ISO datetimes and dates are parsed by the csv reader, nulls are kept and other formats are
+    parsed after reading.
+    """
+    set_global_env('local')
+
+    class Event(Model):
+        created_at = DateTimeColumn(utc=True)
+        day = DateColumn()
+        updated_at = DateTimeColumn(format='%d/%m/%Y %H:%M')
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'event'
+            format = FileFormat.CSV
+
+    storage = Event._meta.storage.local
+    storage.get_full_path('event', FileFormat.CSV).write_text('day,created_at,updated_at\n'
+                                                               '2023-01-02,2023-01-02T10:00:00Z,02/01/2023 10:30\n'
+                                                               ',,\n')
+
+    parsers = Event._meta.columns.get_read_parsers()
+    assert list(parsers) == ['created_at', 'day']
+
+    df = storage.read_file('event', ['day', 'created_at', 'updated_at'], FileFormat.CSV, parsers=parsers)
+    assert df.schema == {'day': polars.Date, 'created_at': polars.Datetime('us', 'UTC'), 'updated_at': polars.Utf8}
+
+    assert Event.df.to_dicts() == [
+        {
+            'created_at': datetime.datetime(2023, 1, 2, 10, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2023, 1, 2),
+            'updated_at': datetime.datetime(2023, 1, 2, 10, 30),
+        },
+        {'created_at': None, 'day': None, 'updated_at': None},
+    ]
+
+
+def test_datetime_columns(model_class_without_local_data, monkeypatch):
+    """
+    Datetimes and dates are parsed with their format after reading, values that do not match it raise.
+    """
+    set_global_env('local')
+
+    class Event(Model):
+        created_at = DateTimeColumn(utc=True)
+        day = DateColumn()
+        updated_at = DateTimeColumn(format='%d/%m/%Y %H:%M')
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'event'
+            format = FileFormat.CSV
+
+    path = Event._meta.storage.local.get_full_path('event', FileFormat.CSV)
+    path.write_text('day,created_at,updated_at\n'
+                    '2023-01-02,2023-01-02T10:00:00Z,02/01/2023 10:30\n'
+                    '2023-01-03,2023-01-03T11:00:00Z,02/01/2023 10:30\n')
+
+    expected_schema = {'created_at': polars.Datetime('us', 'UTC'), 'day': polars.Date, 'updated_at': polars.Datetime}
+    assert Event.df.schema == expected_schema
+    assert Event.lf.collect().schema == expected_schema
+    assert Event.df['updated_at'].to_list() == [datetime.datetime(2023, 1, 2, 10, 30)] * 2
+
+    path.write_text('day,created_at,updated_at\n'
+                    '2023-01-02,2023-13-45T10:00:00Z,02/01/2023 10:30\n')
+
+    with pytest.raises(polars.ComputeError):
+        Event.df
+
+    # Values after the rows checked against the format that do not match it, or match another
+    # ISO format, still raise.
+    monkeypatch.setattr(Event._meta.storage.local, 'PARSE_SAMPLE_ROWS', 1)
+    for created_at in ('2023-13-45T10:00:00Z', '2023-01-03 11:00:00', 'yesterday'):
+        path.write_text('day,created_at,updated_at\n'
+                        '2023-01-02,2023-01-02T10:00:00Z,02/01/2023 10:30\n'
+                        f'2023-01-03,{created_at},02/01/2023 10:30\n')
+
+        with pytest.raises(polars.ComputeError):
+            Event.df
+
+    path.write_text('day,created_at,updated_at\n'
+                    '2023-01-02 10:00:00,2023-01-02 10:00:00,02/01/2023 10:30\n')
+
+    with pytest.raises(polars.ComputeError):
+        Event.df
+
+    # Datetimes with an offset are converted to UTC.
+    column = DateTimeColumn(format='%Y-%m-%d %H:%M%z', utc=True)
+    column.__set_name__(None, 'col')
+    df = polars.DataFrame({'col': ['2023-01-02 12:00+0200']})
+    assert df.select(column.get_col_with_dtype(polars.Utf8))['col'].to_list() == [
+        datetime.datetime(2023, 1, 2, 10, 0, tzinfo=datetime.timezone.utc)
+    ]
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.PARQUET, FileFormat.JSON])
+def test_nested_columns(model_class_without_local_data, file_format):
+    """
+    Struct and list columns keep their nested dtypes through storage, strings are decoded as JSON.
+    """
+    set_global_env('local')
+
+    class Event(Model):
+        payload = StructColumn({'action': StringColumn(), 'size': IntegerColumn(dtype=polars.Int32),
+                                'labels': ListColumn(StringColumn())})
+        ids = ListColumn(IntegerColumn())
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'event'
+            format = file_format
+
+    schema = {
+        'payload': polars.Struct([polars.Field('action', polars.Utf8), polars.Field('size', polars.Int32),
+                                  polars.Field('labels', polars.List(polars.Utf8))]),
+        'ids': polars.List(polars.Int64),
+    }
+    assert Event._meta.columns.get_schema() == schema
+
+    Event.from_data({
+        'payload': ['{"action": "push", "size": 3, "labels": ["a", "b"]}', '{"action": "fork", "size": 1}'],
+        'ids': ['[1, 2]', '[]'],
+    }).save()
+    df = Event.df
+
+    assert df.schema == schema
+    assert df['payload'].to_list() == [{'action': 'push', 'size': 3, 'labels': ['a', 'b']},
+                                       {'action': 'fork', 'size': 1, 'labels': None}]
+    assert df['ids'].to_list() == [[1, 2], []]
+
+
+def test_computed_columns(model_class_without_local_data):
+    """
+    Computed columns are computed with the casts, after them if they use a cast column.
+    """
+    set_global_env('local')
+
+    class CommitMessage(Model):
+        message = StringColumn()
+        day = DateColumn()
+        message_len = IntegerColumn(expr=pl.col('message').str.len_chars())
+        year = IntegerColumn(expr=pl.col('day').dt.year(), dtype=pl.Int32)
+        next_year = IntegerColumn(expr=pl.col('year') + 1)
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'commit_message'
+            format = FileFormat.PARQUET
+
+    plan = CommitMessage._meta.columns.get_plan({'message': pl.Utf8, 'day': pl.Utf8})
+    assert len(plan.casts) == 2 and [len(exprs) for exprs in plan.computed] == [1, 1]
+
+    CommitMessage.from_data({'message': ['fix', 'add tests'], 'day': ['2023-01-02', '2024-05-06']}).save()
+
+    for df in (CommitMessage.df, CommitMessage.lf.collect()):
+        assert df.schema == {'message': pl.Utf8, 'day': pl.Date, 'message_len': pl.Int64,
+                             'year': pl.Int32, 'next_year': pl.Int64}
+        assert df['message_len'].to_list() == [3, 9]
+        assert df['next_year'].to_list() == [2024, 2025]
+
+
+def test_computed_columns_lookups(tmp_path):
+    """
+    Lookups on computed columns are applied after the read, only the other ones reach the database.
+    """
+    set_global_env('local')
+    db_path = str(tmp_path / 'db.sqlite')
+
+    with sqlite3.connect(db_path) as connection:
+        connection.execute('CREATE TABLE commit_message (message TEXT)')
+        connection.executemany('INSERT INTO commit_message VALUES (?)', [('fix',), ('add tests',), ('refactor',)])
+
+    class CommitStorage(StorageGroup):
+        local = SqliteStorage(path=db_path)
+
+    class CommitMessage(Model):
+        message = StringColumn()
+        message_len = IntegerColumn(expr=pl.col('message').str.len_chars())
+
+        class Meta:
+            storage = CommitStorage
+            table_name = 'commit_message'
+            recalculate = 'never'
+
+    assert CommitMessage.where(message_len__gt=3, message__ne='refactor')['message'].to_list() == ['add tests']
@@ -1,13 +1,21 @@
 import copy
+import datetime
 import json
 
 import polars
+import pyarrow
+import pyarrow.parquet
 from polars import testing
 import pytest
 
 from datasaurus import set_global_env
-from datasaurus.core.models.exceptions import FormatNeededError
+from datasaurus.core.models import Model
+from datasaurus.core.models.columns import IntegerColumn, FloatColumn, StringColumn, DateColumn, ListColumn, \
+    StructColumn
+from datasaurus.core.models.exceptions import FormatNeededError, ModelSaveError
+from datasaurus.core.storage import LocalStorage, StorageGroup
 from datasaurus.core.storage.format import FileFormat
+from datasaurus.core.storage.query import Lookup
 
 """
 The Model can create the dataframe from three different sources:
@@ -143,3 +151,535 @@ def test_df_creation_from_storage(model_class_with_local_data):
     reset_meta(model)
 
 # Todo add more cases for other mixins
+
+
+def test_lf_from_storage(model_class_with_local_data):
+    """
+    Model.lf returns a LazyFrame with the same columns, dtypes and data as Model.df
+    """
+    set_global_env('local')
+    model = model_class_with_local_data
+    model._meta.format = FileFormat.PARQUET
+    model.from_data({'col1': ['a', 'b', 'c'], 'col2': [1, 2, 3]}).save()
+
+    lf = model.lf
+
+    assert isinstance(lf, polars.LazyFrame)
+    polars.testing.assert_frame_equal(lf.collect(), model.df)
+    polars.testing.assert_frame_equal(
+        model.lazy().filter(polars.col('col2') > 1).collect(),
+        polars.DataFrame({'col1': ['b', 'c'], 'col2': [2, 3]})
+    )
+
+
+def test_lf_from_calculation(model_class_without_local_data):
+    """
+    calculate_data can return a LazyFrame, Model.df collects it and Model.lf keeps it lazy.
+    """
+    set_global_env('local')
+
+    class FooModel(model_class_without_local_data):
+        def calculate_data(self):
+            return polars.LazyFrame({'col1': ['a', 'b'], 'col2': [1, 2], 'col3': [1, 2]})
+
+    FooModel._meta.recalculate = 'always'
+
+    assert isinstance(FooModel.lf, polars.LazyFrame)
+    assert FooModel.lf.columns == ['col1', 'col2']
+    polars.testing.assert_frame_equal(FooModel.lf.collect(), FooModel.df)
+
+
+def test_lf_missing_columns(model_class_with_local_data):
+    """
+    The column validation is also done when building the LazyFrame.
+    """
+    set_global_env('local')
+    path = model_class_with_local_data._meta.storage.from_env.get_uri()
+    model_class_with_local_data._meta.format = FileFormat.CSV
+
+    polars.DataFrame({'col1': ['a', 'b']}).write_csv(f'{path}/test_model.csv')
+
+    with pytest.raises(ValueError):
+        model_class_with_local_data.lf
+
+
+def test_df_creation_if_stale(model_class_without_local_data):
+    """
+    With recalculate = 'if_stale' calculate_data only runs again when a model it read changed
+    after the data was saved.
+    """
+    set_global_env('local')
+    calls = []
+
+    class Upstream(model_class_without_local_data):
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'upstream'
+            format = FileFormat.CSV
+
+    class Downstream(model_class_without_local_data):
+        def calculate_data(self):
+            calls.append(1)
+            return Upstream.df.with_columns(polars.col('col2') * 2)
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'downstream'
+            format = FileFormat.CSV
+            recalculate = 'if_stale'
+
+    Upstream.from_data({'col1': ['a'], 'col2': [1]}).save()
+    Downstream.save()
+    assert len(calls) == 1
+
+    storage = Downstream._meta.storage.from_env
+    assert list(storage.read_manifest('downstream', FileFormat.CSV)['upstreams']) == [
+        Upstream._get_model_key()
+    ]
+
+    # Nothing changed upstream, data is read from storage.
+    assert Downstream.df['col2'].to_list() == [2]
+    assert len(calls) == 1
+
+    Upstream.from_data({'col1': ['a', 'b'], 'col2': [1, 2]}).save()
+    assert Downstream.df['col2'].to_list() == [2, 4]
+    assert len(calls) == 2
+
+    # Without manifest the data is always stale.
+    storage.get_manifest_path('downstream', FileFormat.CSV).unlink()
+    Downstream.df
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.PARQUET, FileFormat.CSV])
+def test_incremental_save(model_class_without_local_data, file_format):
+    """
+    Models with a watermark get the last saved watermark in calculate_data and their
+    rows are appended.
+    """
+    set_global_env('local')
+    source = polars.DataFrame({'col1': ['a', 'b', 'c', 'd'], 'col2': [1, 2, 3, 4]})
+    watermarks = []
+
+    class IncrementalModel(model_class_without_local_data):
+        def calculate_data(self, watermark=None):
+            watermarks.append(watermark)
+            return self.source.filter(polars.col('col2') > (watermark or 0))
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'incremental'
+            format = file_format
+            watermark = 'col2'
+
+    IncrementalModel.source = source.head(2)
+    IncrementalModel.save()
+
+    IncrementalModel.source = source
+    IncrementalModel.save()
+
+    # Nothing new, nothing is appended.
+    IncrementalModel.save()
+
+    assert watermarks == [None, 2, 4]
+    polars.testing.assert_frame_equal(IncrementalModel.df.sort('col2'), source)
+
+    # A full save rewrites the data.
+    IncrementalModel._meta.watermark = None
+    IncrementalModel._meta.recalculate = 'always'
+    IncrementalModel.source = source.head(1)
+    IncrementalModel.save()
+
+    IncrementalModel._meta.recalculate = 'if_not_data_in_storage'
+    polars.testing.assert_frame_equal(IncrementalModel.df, source.head(1))
+
+
+def test_watermark_has_to_be_a_column(model_class_without_local_data):
+    with pytest.raises(ValueError):
+        class IncrementalModel(model_class_without_local_data):
+            class Meta:
+                watermark = 'does_not_exist'
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.PARQUET, FileFormat.CSV, FileFormat.JSON])
+def test_streaming_save(model_class_with_local_data, file_format):
+    """
+    A streaming save writes the same data as a normal one, even into the file it reads from.
+    """
+    set_global_env('local')
+    model = model_class_with_local_data
+    expected_df = model.df
+
+    model.save(format=file_format, table_name='streamed', streaming=True)
+    model._meta.format = file_format
+    model._meta.table_name = 'streamed'
+
+    polars.testing.assert_frame_equal(model.df, expected_df)
+
+    model.save(streaming=True)
+    polars.testing.assert_frame_equal(model.df, expected_df)
+
+
+def test_save_to_several_targets(model_class_without_local_data):
+    set_global_env('local')
+    calls = []
+
+    class FooModel(model_class_without_local_data):
+        def calculate_data(self):
+            calls.append(1)
+            return polars.DataFrame({'col1': ['a', 'b'], 'col2': [1, 2]})
+
+    FooModel._meta.recalculate = 'always'
+    storage = FooModel._meta.storage.local
+
+    FooModel.save(to=[storage, (storage, FileFormat.CSV), (storage, FileFormat.PARQUET)])
+
+    assert len(calls) == 1
+    for file_format in (FileFormat.JSON, FileFormat.CSV, FileFormat.PARQUET):
+        polars.testing.assert_frame_equal(
+            storage.read_file('test_model', ['col1', 'col2'], file_format),
+            polars.DataFrame({'col1': ['a', 'b'], 'col2': [1, 2]})
+        )
+
+
+def test_save_to_targets_sequences(model_class_without_local_data):
+    """
+    Any list or tuple of targets saves to all of them, a (storage, format) tuple is one target.
+    """
+    set_global_env('local')
+
+    class FooModel(model_class_without_local_data):
+        def calculate_data(self):
+            return polars.DataFrame({'col1': ['a', 'b'], 'col2': [1, 2]})
+
+    storage = FooModel._meta.storage.local
+    FooModel._meta.outputs = ((storage, FileFormat.CSV), (storage, FileFormat.PARQUET))
+    FooModel.save()
+    FooModel.save(to=(storage, FileFormat.IPC))
+
+    for file_format in (FileFormat.CSV, FileFormat.PARQUET, FileFormat.IPC):
+        assert storage.file_exists('test_model', file_format)
+    assert not storage.file_exists('test_model', FileFormat.JSON)
+
+    with pytest.raises(ValueError):
+        FooModel.save(to=[])
+
+
+def test_save_to_several_targets_reports_failures(model_class_without_local_data, tmp_path):
+    set_global_env('local')
+    (tmp_path / 'file').touch()
+
+    class BrokenStorage(StorageGroup):
+        local = LocalStorage(path=str(tmp_path / 'file' / 'dir'))
+
+    class FooModel(model_class_without_local_data):
+        def calculate_data(self):
+            return polars.DataFrame({'col1': ['a', 'b'], 'col2': [1, 2]})
+
+    storage = FooModel._meta.storage.local
+    FooModel._meta.outputs = [(BrokenStorage.local, FileFormat.CSV), (storage, FileFormat.CSV)]
+
+    with pytest.raises(ModelSaveError) as e:
+        FooModel.save()
+
+    assert list(e.value.errors) == [(BrokenStorage.local, FileFormat.CSV, 'test_model')]
+    assert storage.file_exists('test_model', FileFormat.CSV)
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.PARQUET, FileFormat.CSV])
+def test_shrink_dtypes(model_class_without_local_data, file_format):
+    """
+    Shrunk dtypes are computed from the data and kept when the data is read back, also from
+    formats without dtypes.
+    """
+    set_global_env('local')
+
+    class FooModel(Model):
+        id = IntegerColumn()
+        stars = IntegerColumn()
+        ratio = FloatColumn()
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'foo'
+            format = file_format
+            shrink_dtypes = True
+
+    FooModel.from_data({'id': [1, 2], 'stars': [0, 40_000], 'ratio': [0.5, 0.25]}).save()
+
+    expected_schema = {'id': polars.Int8, 'stars': polars.UInt16, 'ratio': polars.Float32}
+    assert FooModel.df.schema == expected_schema
+    assert FooModel.lf.schema == expected_schema
+    assert next(FooModel.iter_batches(batch_size=1)).schema == expected_schema
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_parquet_options(model_class_without_local_data, streaming):
+    """
+    The parquet options of the model and its columns are used on every parquet write.
+    """
+    set_global_env('local')
+
+    class FooModel(Model):
+        id = IntegerColumn(parquet_options={'compression': 'gzip', 'statistics': False})
+        name = StringColumn(parquet_options={'dictionary': False})
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'foo'
+            format = FileFormat.PARQUET
+            parquet_options = {'compression': 'snappy', 'statistics': True, 'row_group_size': 2}
+
+    FooModel.from_data({'id': [1, 2, 3], 'name': ['a', 'b', 'a']}).save(streaming=streaming)
+
+    path = FooModel._meta.storage.local.get_full_path('foo', FileFormat.PARQUET)
+    metadata = pyarrow.parquet.ParquetFile(path).metadata
+    id_column, name_column = metadata.row_group(0).column(0), metadata.row_group(0).column(1)
+
+    assert metadata.num_row_groups == 2
+    assert (id_column.compression, name_column.compression) == ('GZIP', 'SNAPPY')
+    assert not id_column.is_stats_set and name_column.is_stats_set
+    assert 'RLE_DICTIONARY' not in name_column.encodings
+    assert FooModel.df['name'].to_list() == ['a', 'b', 'a']
+
+    with pytest.raises(ValueError):
+        IntegerColumn(parquet_options={'row_group_size': 2})
+
+
+@pytest.mark.parametrize('compression', ['uncompressed', 'zstd'])
+def test_ipc_format(model_class_without_local_data, compression):
+    """
+    Models are saved as Arrow IPC files with the compression of the Meta class, overwriting them
+    does not change the dataframes that were read from them. Files named '.feather' keep the name.
+    """
+    set_global_env('local')
+
+    class FooModel(Model):
+        id = IntegerColumn()
+        name = StringColumn()
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'foo'
+            format = FileFormat.FEATHER
+            ipc_compression = compression
+
+    FooModel.from_data({'id': [1, 2, 3], 'name': ['a', 'b', 'a']}).save()
+    df = FooModel.df
+
+    FooModel.from_data({'id': [4], 'name': ['c']}).save()
+
+    assert FooModel._meta.storage.local.file_exists('foo', FileFormat.IPC)
+    assert df.to_dict(as_series=False) == {'id': [1, 2, 3], 'name': ['a', 'b', 'a']}
+    assert FooModel._meta.storage.local.read_file('foo', ['name'], format=FileFormat.IPC)['name'].to_list() == ['c']
+
+    FooModel.from_data({'id': [5, 6], 'name': ['d', 'e']}).save(table_name='foo.feather')
+    storage = FooModel._meta.storage.local
+    assert storage.get_full_path('foo.feather', FileFormat.IPC).name == 'foo.feather'
+    assert storage.file_exists('foo.feather', FileFormat.IPC)
+    assert [batch.to_dict(as_series=False) for batch in storage.iter_batches(
+        'foo.feather', ['name'], FileFormat.IPC, batch_size=1
+    )] == [{'name': ['d']}, {'name': ['e']}]
+
+    with pytest.raises(ValueError):
+        type('BarModel', (Model,), {'__module__': __name__, 'Meta': type('Meta', (), {'ipc_compression': 'gzip'})})
+
+
+@pytest.mark.parametrize('file_name, compression', [
+    ('events.ndjson.gz', 'gzip'), ('events.csv.zst', 'zstd'), ('events.json.bz2', 'bz2')
+])
+def test_compressed_formats(model_class_without_local_data, file_name, compression):
+    """
+    Compressed text formats are inferred from the table name, written compressed and read back
+    in batches while they are decompressed.
+    """
+    set_global_env('local')
+
+    class Event(Model):
+        id = IntegerColumn()
+        action = StringColumn()
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = file_name
+
+    events = {'id': [1, 2, 3], 'action': ['push', 'fork', 'push']}
+    Event.from_data(events).save()
+
+    path = Event._meta.storage.local.get_full_path(file_name, FileFormat[file_name.partition('.')[2]])
+    with pyarrow.input_stream(path, compression=compression) as stream:
+        assert b'push' in stream.read()
+
+    assert path.name == file_name
+    assert Event.df.to_dict(as_series=False) == events
+    assert [batch.height for batch in Event.iter_batches(batch_size=2)] == [2, 1]
+
+    with pytest.raises(ValueError):
+        FileFormat.PARQUET.with_compression('gzip')
+
+
+def test_compressed_nested_columns(model_class_without_local_data):
+    """
+    Nested columns are read back from compressed ndjson files.
+    """
+    set_global_env('local')
+
+    class Event(Model):
+        labels = ListColumn(StringColumn())
+        payload = StructColumn({'action': StringColumn(), 'ids': ListColumn(IntegerColumn())})
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'events'
+            format = FileFormat['ndjson.gz']
+
+    events = {
+        'labels': [['a', 'b'], ['c'], ['d']],
+        'payload': [{'action': 'push', 'ids': [1, 2]}, {'action': 'fork', 'ids': [3]}, {'action': None, 'ids': [4]}],
+    }
+    Event.from_data(events).save()
+
+    df = Event.df
+    assert df.schema == Event.from_data(events).df.schema
+    assert df.to_dict(as_series=False) == events
+    assert polars.concat(Event.iter_batches(batch_size=2)).to_dict(as_series=False) == events
+
+
+def test_partitioned_save(model_class_without_local_data, monkeypatch):
+    """
+    Partitioned models are saved as a hive style dataset, predicates and lookups on partition
+    columns only scan the partitions that can match.
+    """
+    set_global_env('local')
+
+    class Commit(Model):
+        repo = StringColumn()
+        day = DateColumn()
+        additions = IntegerColumn()
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'commit'
+            format = FileFormat.PARQUET
+            partition_by = ['repo', 'day']
+
+    data = {
+        'repo': ['polars', 'polars', 'surister/datasaurus', None],
+        'day': ['2023-01-01', '2023-01-02', '2023-01-01', '2023-01-01'],
+        'additions': [1, 2, 3, 4],
+    }
+    Commit.from_data(data).save()
+
+    storage = Commit._meta.storage.local
+    path = storage.get_full_path('commit', FileFormat.PARQUET)
+    assert sorted(str(file.parent.relative_to(path)) for file in storage.get_files('commit', FileFormat.PARQUET)) == [
+        'repo=__HIVE_DEFAULT_PARTITION__/day=2023-01-01',
+        'repo=polars/day=2023-01-01',
+        'repo=polars/day=2023-01-02',
+        'repo=surister%2Fdatasaurus/day=2023-01-01',
+    ]
+
+    df = Commit.df.sort('additions')
+    assert df.schema == {'repo': polars.Utf8, 'day': polars.Date, 'additions': polars.Int64}
+    assert df['repo'].to_list() == data['repo']
+
+    lookups = [Lookup('repo', 'eq', 'polars'), Lookup('day', 'gte', datetime.date(2023, 1, 2))]
+    predicates = [lookup.to_polars() for lookup in lookups]
+    assert len(storage.prune_partitions('commit', FileFormat.PARQUET, ['repo', 'day'], predicates)) == 1
+    assert len(storage.prune_partitions('commit', FileFormat.PARQUET, ['repo', 'day'], [
+        polars.col('repo').str.starts_with('surister') | polars.col('day').dt.day().is_between(2, 3)
+    ])) == 2
+    assert storage.prune_partitions('commit', FileFormat.PARQUET, ['repo', 'day'], [
+        polars.col('additions') > 1
+    ]) is None
+
+    pruned = []
+    prune_partitions = type(storage).prune_partitions
+    monkeypatch.setattr(type(storage), 'prune_partitions',
+                        lambda *args: pruned.append(prune_partitions(*args)) or pruned[-1])
+
+    assert Commit.filter(polars.col('repo') == 'polars', polars.col('additions') > 1)['additions'].to_list() == [2]
+    assert len(pruned.pop()) == 2
+    assert Commit.filter(repo='polars', day__gte=datetime.date(2023, 1, 2))['additions'].to_list() == [2]
+    assert Commit.filter(repo__in=['nothing']).is_empty()
+    assert Commit.filter(repo__isnull=True)['additions'].to_list() == [4]
+    assert Commit.lf.filter(polars.col('repo') == 'surister/datasaurus').collect()['additions'].to_list() == [3]
+
+    with pytest.raises(ValueError):
+        Commit.from_data(data).save(format=FileFormat.CSV)
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.PARQUET, FileFormat.CSV, FileFormat.JSON, FileFormat.IPC])
+def test_iter_batches(model_class_with_local_data, file_format):
+    set_global_env('local')
+    model = model_class_with_local_data
+    expected_df = model.df
+
+    model.save(format=file_format)
+    model._meta.format = file_format
+
+    batches = list(model.iter_batches(batch_size=3))
+
+    assert [batch.height for batch in batches] == [3, 1]
+    assert all(batch.schema == expected_df.schema for batch in batches)
+    polars.testing.assert_frame_equal(polars.concat(batches), expected_df)
+
+
+def test_iter_batches_from_data(model_class_without_local_data):
+    set_global_env('local')
+    model = model_class_without_local_data.from_data({'col1': ['a', 'b', 'c'], 'col2': [1, 2, 3]})
+
+    assert [batch.height for batch in model.iter_batches(batch_size=2)] == [2, 1]
+
+
+def test_filter(model_class_with_local_data):
+    set_global_env('local')
+    model = model_class_with_local_data
+    model.save(format=FileFormat.PARQUET)
+    model._meta.format = FileFormat.PARQUET
+
+    expected_df = polars.DataFrame({'col1': ['b', 'c'], 'col2': [2, 3]})
+
+    polars.testing.assert_frame_equal(
+        model.filter(polars.col('col2') > 1, polars.col('col2') < 4), expected_df
+    )
+    polars.testing.assert_frame_equal(model.filter(col2__gt=1, col2__lt=4), expected_df)
+    polars.testing.assert_frame_equal(model.where(col1__in=['b', 'c']), expected_df)
+    polars.testing.assert_frame_equal(model.filter(), model.df)
+
+    with pytest.raises(ValueError):
+        model.where(does_not_exist=1)
+
+
+def test_from_data_is_bound_per_thread(model_class_without_local_data):
+    """
+    Threads building the same model from different data do not see each other's data.
+    """
+    import threading
+
+    set_global_env('local')
+    model = model_class_without_local_data
+    barrier = threading.Barrier(2, timeout=5)
+    results = {}
+
+    def build(value):
+        model.from_data({'col1': [value], 'col2': [1]})
+        barrier.wait()
+        results[value] = model.df['col1'].to_list()
+
+    threads = [threading.Thread(target=build, args=(value,)) for value in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {'a': ['a'], 'b': ['b']}
+
+
+def test_from_data_is_zero_copy(model_class_without_local_data):
+    df = polars.DataFrame({'col1': ['a'], 'col2': [1]})
+
+    assert model_class_without_local_data.from_data(df).df is df
+
+    with pytest.raises(ValueError):
+        model_class_without_local_data.from_data(None)
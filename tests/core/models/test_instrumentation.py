@@ -0,0 +1,53 @@
+import polars
+
+from datasaurus import set_global_env, instrumentation
+
+
+def test_instrumentation_reports_phases(model_class_with_local_data):
+    set_global_env('local')
+    model = model_class_with_local_data
+
+    with instrumentation.InstrumentationCollector() as collector:
+        model.df
+
+    phases = [event.phase for event in collector.events]
+    assert phases[0] == instrumentation.RESOLVE_STORAGE
+    assert instrumentation.READ in phases
+    assert instrumentation.VALIDATE in phases
+
+    read = collector.summary()[model][instrumentation.READ]
+    assert read['count'] == 1
+    assert read['rows'] == model.df.height
+    assert read['bytes'] > 0
+    assert read['wall_time'] >= 0 and read['cpu_time'] >= 0
+
+
+def test_instrumentation_reports_calculate_and_write(model_class_without_local_data):
+    set_global_env('local')
+
+    class FooModel(model_class_without_local_data):
+        def calculate_data(self):
+            return polars.DataFrame({'col2': [1, 2, 3], 'col1': ['a', 'b', 'c']})
+
+    with instrumentation.InstrumentationCollector() as collector:
+        FooModel.save()
+
+    summary = collector.summary()[FooModel]
+    assert summary[instrumentation.CALCULATE]['rows'] == 3
+    # The columns are not in the model's order.
+    assert summary[instrumentation.SELECT]['rows'] == 3
+    assert summary[instrumentation.WRITE]['rows'] == 3
+
+
+def test_instrumentation_unsubscribe(model_class_with_local_data):
+    set_global_env('local')
+    events = []
+
+    instrumentation.subscribe(events.append)
+    model_class_with_local_data.df
+    instrumentation.unsubscribe(events.append)
+
+    seen = len(events)
+    model_class_with_local_data.df
+
+    assert seen and len(events) == seen
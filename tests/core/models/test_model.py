@@ -1,8 +1,10 @@
+import copy
+
 import pytest
 
 import datasaurus
 from datasaurus.core import models
-from datasaurus.core.models import Model
+from datasaurus.core.models import Model, ModelBatch
 from datasaurus.core.models.exceptions import MissingMetaError, ColumnNotExistsError
 from datasaurus.core.models.columns import Column, Columns
 from datasaurus.core.storage import StorageGroup, LocalStorage
@@ -159,3 +161,34 @@ def test_model_columns_inheritance():
         class FooBarModel(BarModel, FooModel, AnotherModel):
             pass
 
+
+def test_model_instances_are_slotted(model_class_dummy):
+    model = model_class_dummy(column='text')
+
+    assert isinstance(model, model_class_dummy)
+    assert not hasattr(model, '__dict__')
+
+    # Only columns can be set.
+    with pytest.raises(AttributeError):
+        model.not_a_column = 1
+
+    copied = copy.deepcopy(model)
+    assert isinstance(copied, model_class_dummy) and copied.column == 'text'
+
+
+def test_model_batch(model_class_with_local_data):
+    datasaurus.set_global_env('local')
+
+    batch = model_class_with_local_data.as_batch()
+
+    assert len(batch) == 4
+    assert isinstance(batch, ModelBatch)
+    assert batch.df.columns == ['col1', 'col2']
+    assert (batch[1].col1, batch[1].col2) == ('b', 2)
+    assert [row.col2 for row in batch[2:]] == [3, 4]
+    assert isinstance(batch[-1], model_class_with_local_data)
+
+    rows = [model_class_with_local_data(col1='a', col2=1), model_class_with_local_data(col1='b')]
+    assert ModelBatch.from_rows(model_class_with_local_data, rows).df.to_dict(as_series=False) == {
+        'col1': ['a', 'b'], 'col2': [1, None]
+    }
@@ -0,0 +1,124 @@
+import threading
+from collections import Counter
+
+import polars
+import pytest
+
+from datasaurus import set_global_env
+from datasaurus.core.models import ModelScheduler
+from datasaurus.core.models.exceptions import ModelDependencyCycleError
+
+
+@pytest.fixture
+def diamond_models(model_class_without_local_data):
+    """
+    Root <- Left, Right <- Bottom, where Left and Right must run concurrently.
+    """
+    set_global_env('local')
+    calls = Counter()
+    barrier = threading.Barrier(2, timeout=5)
+
+    class Root(model_class_without_local_data):
+        def calculate_data(self):
+            calls['root'] += 1
+            return polars.DataFrame({'col1': ['a', 'b'], 'col2': [1, 2]})
+
+    class Left(model_class_without_local_data):
+        def calculate_data(self):
+            calls['left'] += 1
+            barrier.wait()
+            return Root.df.with_columns(polars.col('col2') * 2)
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            format = model_class_without_local_data._meta.format
+            table_name = 'left'
+            depends_on = [Root]
+
+    class Right(model_class_without_local_data):
+        def calculate_data(self):
+            calls['right'] += 1
+            barrier.wait()
+            return Root.df.with_columns(polars.col('col2') * 3)
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            format = model_class_without_local_data._meta.format
+            table_name = 'right'
+            depends_on = [Root]
+
+    class Bottom(model_class_without_local_data):
+        def calculate_data(self):
+            calls['bottom'] += 1
+            return polars.concat([Left.df, Right.df, Root.df])
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            format = model_class_without_local_data._meta.format
+            table_name = 'bottom'
+            depends_on = [Left, Right]
+
+    for model in (Root, Left, Right, Bottom):
+        model._meta.recalculate = 'always'
+
+    return Root, Left, Right, Bottom, calls
+
+
+def test_scheduler_computes_each_model_once(diamond_models):
+    root, left, right, bottom, calls = diamond_models
+
+    results = ModelScheduler([bottom], max_workers=4).run()
+
+    assert set(results) == {root, left, right, bottom}
+    assert calls == {'root': 1, 'left': 1, 'right': 1, 'bottom': 1}
+    assert results[bottom]['col2'].to_list() == [2, 4, 3, 6, 1, 2]
+
+
+def test_scheduler_records_undeclared_dependencies(diamond_models):
+    root, left, right, bottom, calls = diamond_models
+    bottom._meta.depends_on = ()
+
+    scheduler = ModelScheduler([root, left, right, bottom], max_workers=4)
+    scheduler.run()
+
+    assert calls == {'root': 1, 'left': 1, 'right': 1, 'bottom': 1}
+    assert scheduler.graph[bottom] == {left, right, root}
+
+
+def test_scheduler_computes_undeclared_shared_upstream_once(diamond_models):
+    root, left, right, bottom, calls = diamond_models
+    left._meta.depends_on = right._meta.depends_on = ()
+
+    results = ModelScheduler([bottom], max_workers=4).run()
+
+    assert root in results
+    assert calls == {'root': 1, 'left': 1, 'right': 1, 'bottom': 1}
+
+    # The upstreams recorded by the first run are scheduled from the start in the next ones.
+    scheduler = ModelScheduler([bottom], max_workers=4)
+    assert root in scheduler.models
+    scheduler.run()
+
+    assert calls == {'root': 2, 'left': 2, 'right': 2, 'bottom': 2}
+    assert scheduler.graph[left] == scheduler.graph[right] == {root}
+
+
+def test_scheduler_saves_models(diamond_models):
+    root, left, right, bottom, calls = diamond_models
+
+    ModelScheduler([bottom], save=True).run()
+
+    storage = root._meta.storage.from_env
+    assert all(
+        storage.file_exists(model._meta.table_name, model._meta.format)
+        for model in (root, left, right, bottom)
+    )
+    assert calls == {'root': 1, 'left': 1, 'right': 1, 'bottom': 1}
+
+
+def test_scheduler_detects_cycles(diamond_models):
+    root, left, right, bottom, calls = diamond_models
+    root._meta.depends_on = [bottom]
+
+    with pytest.raises(ModelDependencyCycleError):
+        ModelScheduler([bottom]).run()
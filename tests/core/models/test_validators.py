@@ -0,0 +1,146 @@
+import polars
+import pytest
+
+from datasaurus import set_global_env
+from datasaurus.core.models import Model, ValidationError
+from datasaurus.core.models.columns import StringColumn, IntegerColumn
+from datasaurus.core.storage.format import FileFormat
+from datasaurus.core.models.validators import (AllowedValuesValidator, ExpressionValidator, NotNullValidator,
+                                               RangeValidator, RegexValidator, UniqueValidator)
+
+
+@pytest.fixture
+def validated_model(model_class_without_local_data):
+    set_global_env('local')
+
+    class Repository(Model):
+        col1 = StringColumn(validators=[NotNullValidator(), RegexValidator(r'^[a-z]+$')])
+        col2 = IntegerColumn(validators=[
+            RangeValidator(min_value=0, max_value=100),
+            UniqueValidator(),
+            ExpressionValidator(lambda col: col % 2 == 0, name='even'),
+        ])
+        col3 = StringColumn(validators=[AllowedValuesValidator(['MIT', 'GPL'])])
+
+        class Meta:
+            storage = model_class_without_local_data._meta.storage
+            table_name = 'repository'
+            format = model_class_without_local_data._meta.format
+
+    return Repository
+
+
+def test_validators_pass(validated_model):
+    df = polars.DataFrame({'col1': ['a', 'b'], 'col2': [2, 4], 'col3': ['MIT', None]})
+
+    assert validated_model.from_data(df).df.height == 2
+
+
+def test_validators_raise(validated_model):
+    df = polars.DataFrame({
+        'col1': ['a', None, 'B'],
+        'col2': [2, 2, 101],
+        'col3': ['MIT', 'BSD', 'GPL'],
+    })
+
+    with pytest.raises(ValidationError) as e:
+        validated_model.from_data(df).df
+
+    assert e.value.failures == {
+        'col1:not_null': 1,
+        'col1:regex': 1,
+        'col2:range': 1,
+        'col2:unique': 2,
+        'col2:even': 1,
+        'col3:allowed_values': 1,
+    }
+
+
+def test_validators_raise_on_collect(validated_model):
+    lf = validated_model.from_data({'col1': ['a'], 'col2': [-2], 'col3': ['MIT']}).lf
+
+    with pytest.raises(polars.ComputeError, match='col2:range'):
+        lf.collect()
+
+
+def test_validators_quarantine(validated_model):
+    validated_model._meta.quarantine = 'repository_quarantine'
+    df = polars.DataFrame({'col1': ['a', 'b', 'c'], 'col2': [2, 3, 4], 'col3': ['MIT', 'MIT', 'BSD']})
+
+    assert validated_model.from_data(df).df['col1'].to_list() == ['a']
+
+    storage, format = validated_model._get_storage_and_format(None)
+    quarantined = storage.read_file('repository_quarantine', None, format)
+
+    assert quarantined['col1'].to_list() == ['b', 'c']
+    assert quarantined['failed_validators'].to_list() == ['col2:even', 'col3:allowed_values']
+
+
+@pytest.mark.parametrize('file_format', [FileFormat.JSON, FileFormat.PARQUET])
+def test_validators_quarantine_once_per_calculation(validated_model, file_format):
+    """
+    Invalid rows are quarantined when they are calculated, reading the saved data again does not
+    quarantine them again and formats that cannot be appended to keep the rows already quarantined.
+    """
+    class QuarantinedRepository(validated_model):
+        def calculate_data(self):
+            return polars.DataFrame({'col1': ['a', 'b', 'c'], 'col2': [2, 3, 4], 'col3': ['MIT', 'MIT', 'BSD']})
+
+        class Meta:
+            storage = validated_model._meta.storage
+            table_name = 'repository'
+            format = file_format
+            quarantine = 'repository_quarantine'
+
+    storage, format = QuarantinedRepository._get_storage_and_format(None)
+
+    def quarantined_rows():
+        return storage.read_file('repository_quarantine', None, format).height
+
+    QuarantinedRepository.save()
+    assert quarantined_rows() == 2
+
+    assert QuarantinedRepository.df.height == 1
+    assert QuarantinedRepository.df.height == 1
+    assert QuarantinedRepository.lf.collect().height == 1
+    assert QuarantinedRepository.filter(polars.col('col2') > 0).height == 1
+    QuarantinedRepository.save()
+    assert quarantined_rows() == 2
+
+    # Invalid rows in storage are removed when read, but not quarantined on every read.
+    storage.write_file(QuarantinedRepository.calculate_data(None), 'repository', format=format)
+    assert QuarantinedRepository.df.height == 1
+    assert QuarantinedRepository.df.height == 1
+    assert quarantined_rows() == 2
+
+    QuarantinedRepository.from_data(QuarantinedRepository.calculate_data(None)).df
+    assert quarantined_rows() == 4
+
+
+def test_validators_keep_pushdown(validated_model):
+    """
+    Filters and projections of queries on data read from storage are pushed down to the scan,
+    only the rows and columns the query reads are validated.
+    """
+    class ParquetRepository(validated_model):
+        class Meta:
+            storage = validated_model._meta.storage
+            table_name = 'repository'
+            format = FileFormat.PARQUET
+
+    storage, format = ParquetRepository._get_storage_and_format(None)
+    storage.write_file(
+        polars.DataFrame({'col1': ['a', 'b', 'c'], 'col2': [2, 4, 3], 'col3': ['MIT', 'GPL', 'BSD']}),
+        'repository',
+        format=format,
+    )
+
+    plan = ParquetRepository.lf.filter(polars.col('col2') < 3).select('col1').explain()
+    assert 'SELECTION' in plan and 'PROJECT 2/3 COLUMNS' in plan
+    assert ParquetRepository.lf.explain(streaming=True, comm_subplan_elim=False).startswith('--- STREAMING')
+
+    assert ParquetRepository.lf.filter(polars.col('col2') < 3).select('col1').collect()['col1'].to_list() == ['a']
+    assert ParquetRepository.filter(polars.col('col2') < 4, col1='a')['col2'].to_list() == [2]
+
+    with pytest.raises(polars.ComputeError, match='col2:even'):
+        ParquetRepository.filter(polars.col('col2') == 3)
@@ -0,0 +1,62 @@
+import sqlite3
+
+import polars
+import pytest
+
+from datasaurus.core.storage.query import Lookup, lookups_to_sql
+from datasaurus.core.storage.storage import SqliteStorage
+
+
+@pytest.mark.parametrize(
+    'key, value, expected_sql, expected_params',
+    [
+        ('repo', 'x', 'repo = :p', {'p': 'x'}),
+        ('stars__gte', 10, 'stars >= :p', {'p': 10}),
+        ('stars__ne', 10, 'stars != :p', {'p': 10}),
+        ('repo__in', ['x', 'y'], 'repo IN (:p_0, :p_1)', {'p_0': 'x', 'p_1': 'y'}),
+        ('repo__in', [], '1 = 0', {}),
+        ('repo__isnull', True, 'repo IS NULL', {}),
+        ('repo__isnull', False, 'repo IS NOT NULL', {}),
+    ]
+)
+def test_lookup_to_sql(key, value, expected_sql, expected_params):
+    assert Lookup.from_kwarg(key, value).to_sql('p') == (expected_sql, expected_params)
+
+
+def test_lookup_to_polars():
+    df = polars.DataFrame({'repo': ['x', 'y', None], 'stars': [1, 10, 100]})
+
+    def filter_by(**lookups):
+        return df.filter([Lookup.from_kwarg(key, value).to_polars() for key, value in lookups.items()])
+
+    assert filter_by(stars__gte=10).height == 2
+    assert filter_by(stars__gte=10, repo='y').height == 1
+    assert filter_by(repo__in=['x', 'y']).height == 2
+    assert filter_by(repo__isnull=True)['stars'].to_list() == [100]
+
+
+def test_unsupported_lookup():
+    with pytest.raises(ValueError):
+        Lookup.from_kwarg('stars__between', (1, 2))
+
+
+def test_lookups_to_sql():
+    where, params = lookups_to_sql([Lookup('repo', 'eq', 'x'), Lookup('stars', 'lt', 3)])
+
+    assert where == ' WHERE repo = :p0 AND stars < :p1'
+    assert params == {'p0': 'x', 'p1': 3}
+    assert lookups_to_sql([]) == ('', {})
+
+
+def test_sql_read_with_lookups(tmp_path):
+    db_path = str(tmp_path / 'db.sqlite')
+    with sqlite3.connect(db_path) as connection:
+        connection.execute('CREATE TABLE commits (repo TEXT, stars INTEGER)')
+        connection.executemany('INSERT INTO commits VALUES (?, ?)', [('x', 1), ('y', 2), ('x', 3)])
+
+    storage = SqliteStorage(path=db_path)
+    df = storage.read_file('commits', ['repo', 'stars'],
+                           lookups=[Lookup('repo', 'eq', 'x'), Lookup('stars', 'gt', 1)])
+
+    assert df.rows() == [('x', 3)]
+    assert storage.read_file('commits', ['repo', 'stars'], lookups=[Lookup('repo', 'in', [])]).is_empty()
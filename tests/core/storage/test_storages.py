@@ -1,3 +1,8 @@
+import datetime
+import sqlite3
+
+import polars
+from polars import testing
 import pytest
 
 from datasaurus.core.storage import LocalStorage
@@ -30,3 +35,77 @@ def test_write_to_storage(storage, format, dummy_dataframe, storage_name):
     dummy_filename = 'dummy'
     storage.write_file(df=dummy_dataframe, file_name=dummy_filename, format=format)
     assert storage.file_exists(dummy_filename, format=format)
+
+
+@pytest.mark.parametrize('format', [FileFormat.PARQUET, FileFormat.CSV])
+def test_append_to_local_storage(storage_group_with_one_storage_per_environment, dummy_dataframe, format):
+    """Appending to an existing file keeps the previous rows, writing replaces everything"""
+    storage = storage_group_with_one_storage_per_environment.local
+    storage.write_file(dummy_dataframe, 'dummy', format=format)
+    storage.append_file(dummy_dataframe, 'dummy', format=format)
+
+    columns = dummy_dataframe.columns
+    assert storage.read_file('dummy', columns, format=format).height == dummy_dataframe.height * 2
+    assert storage.scan_file('dummy', columns, format=format).collect().height == dummy_dataframe.height * 2
+
+    storage.write_file(dummy_dataframe, 'dummy', format=format)
+    assert storage.read_file('dummy', columns, format=format).height == dummy_dataframe.height
+
+
+@pytest.mark.parametrize('format', [
+    FileFormat.PARQUET, FileFormat.CSV, FileFormat.AVRO, FileFormat.JSON, FileFormat.NDJSON,
+    FileFormat['csv.gz'], FileFormat['ndjson.zst']
+])
+def test_read_file_projection(storage_group_with_one_storage_per_environment, format):
+    """Only the requested columns are read, in the requested order, missing ones are left out, also in batches"""
+    storage = storage_group_with_one_storage_per_environment.local
+    df = polars.DataFrame({'id': [1, 2], 'name': ['a', 'b'], 'score': [1.5, 2.5]})
+    storage.write_file(df, 'projection', format=format)
+
+    read = storage.read_file('projection', ['score', 'id', 'missing'], format=format)
+    assert read.columns == ['score', 'id']
+    assert read.to_dict(as_series=False) == {'score': [1.5, 2.5], 'id': [1, 2]}
+
+    batches = storage.iter_batches('projection', ['score', 'id', 'missing'], format=format, batch_size=1)
+    assert polars.concat(batches).to_dict(as_series=False) == {'score': [1.5, 2.5], 'id': [1, 2]}
+
+
+@pytest.mark.parametrize('format', [FileFormat.CSV, FileFormat.NDJSON])
+def test_compressed_read_dtypes(storage_group_with_one_storage_per_environment, format):
+    """Compressed files are read with the same dtypes as the uncompressed ones"""
+    storage = storage_group_with_one_storage_per_environment.local
+    df = polars.DataFrame({
+        'id': [1, 2],
+        'score': [1.5, 2.5],
+        'name': ['a', None],
+        'message': ['', 'fix'],
+        'created_at': ['2023-01-02T10:00:00Z', '2023-01-03T10:00:00.123Z'],
+        'merged': [True, False],
+    })
+    compressed_format = format.with_compression('gzip')
+    storage.write_file(df, 'plain', format=format)
+    storage.write_file(df, 'compressed', format=compressed_format)
+
+    plain = storage.read_file('plain', None, format=format)
+    testing.assert_frame_equal(storage.read_file('compressed', None, format=compressed_format), plain)
+    testing.assert_frame_equal(storage.read_file('compressed', ['created_at', 'id'], format=compressed_format),
+                               plain.select('created_at', 'id'))
+    assert next(storage.iter_batches('compressed', df.columns, format=compressed_format)).schema == plain.schema
+
+
+def test_read_max(storage_group_with_one_storage_per_environment, tmp_path):
+    """The max is taken after the cast, SQL storages compute it in the database"""
+    storage = storage_group_with_one_storage_per_environment.local
+    df = polars.DataFrame({'day': ['31/01/2023', '01/02/2023'], 'id': [1, 2]})
+    storage.write_file(df, 'days', format=FileFormat.CSV)
+
+    assert storage.read_max('days', 'day', format=FileFormat.CSV) == '31/01/2023'
+    assert storage.read_max('days', 'day', format=FileFormat.CSV,
+                            cast=lambda dtype: polars.col('day').str.to_date('%d/%m/%Y')) == datetime.date(2023, 2, 1)
+
+    sqlite_storage = SqliteStorage(path=str(tmp_path / 'db.sqlite'))
+    with sqlite3.connect(sqlite_storage.path) as connection:
+        connection.execute('CREATE TABLE days (day TEXT, id INTEGER)')
+        connection.executemany('INSERT INTO days VALUES (?, ?)', df.rows())
+
+    assert sqlite_storage.read_max('days', 'id') == 2